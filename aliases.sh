@@ -5,7 +5,7 @@ HOMEDIR="$(cd "$(dirname "${BASH_SOURCE[0]}")"; pwd -P)"
 # Install Commands
 #############################################
 alias i="cd $HOMEDIR/app && bun install && cd $HOMEDIR || cd $HOMEDIR"
-alias pyenv="cd $HOMEDIR && python3 -m venv env && source env/bin/activate && pip3 install -r requirements.txt"
+alias pyenv="cd $HOMEDIR && python3 -m venv env && source env/bin/activate && pip3 install -r requirements-dev.txt"
 
 #############################################
 # Run Commands
@@ -17,6 +17,8 @@ alias runpy='\
   python -m uvicorn index:app --reload --host 127.0.0.1 --port 8000; \
   cd $HOMEDIR\
 '
+alias bench='cd $HOMEDIR && python -m benchmarks.kernels'
+alias bench-cold='cd $HOMEDIR && python -m benchmarks.cold_start'
 
 # Misc
 alias clean="rm -rf $HOMEDIR/app/.next $HOMEDIR/app/node_modules"
@@ -1,24 +1,33 @@
 import os
 import time
+import asyncio
 import random
-import numpy as np
-import pandas as pd
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Query, Path, HTTPException, Depends, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from datetime import date, datetime
-from modules.derivatives.monte_carlo import monte_carlo
-from modules.derivatives.black_scholes import black_scholes_option
-from modules.derivatives.longstaff_schwartz import longstaff_schwartz
-from modules.derivatives.binomial_model import EUPrice, USPrice
-from modules.markowitz.main import main
-from typing import List, Literal
+from modules.server import http_cache, metrics
+from modules.server.cache import LRUCache
+from modules.server.singleflight import SingleFlight
+from modules.server.timing import ServerTimingMiddleware, stage, set_labels
+from typing import TYPE_CHECKING, List, Literal, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from sqlalchemy import text
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from pydantic import BaseModel, Field, model_validator
 from dotenv import load_dotenv
 
+# The numerical stack (numpy, pandas, cvxopt and the modules built on them) is imported inside the routes
+# which use it, so a cold start only pays for the libraries its first request needs
+if TYPE_CHECKING:
+    import pandas as pd
+    from modules.derivatives.pricing_grid import GridCache
+
 load_dotenv() 
 # import redis
 # import functools
@@ -46,13 +55,17 @@ load_dotenv()
 
 DB_URL = os.getenv("DB_CONNECTION_STRING", "").replace("postgresql+psycopg2", "postgresql+asyncpg")
 
-# Create the engine at the module level
-engine = create_async_engine(DB_URL, pool_size=5, max_overflow=2)
+# The engine and session factory are created on first use, as creating the engine loads the database driver
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+
 
-# Create the session factory at the module level
-AsyncSessionLocal = sessionmaker(
-    bind=engine, class_=AsyncSession, expire_on_commit=False
-)
+def get_engine() -> AsyncEngine:
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = create_async_engine(DB_URL, pool_size=5, max_overflow=2)
+        _session_factory = sessionmaker(bind=_engine, class_=AsyncSession, expire_on_commit=False)
+    return _engine
 
 # --- Application Lifecycle ---
 @asynccontextmanager
@@ -62,32 +75,126 @@ async def lifespan(app: FastAPI):
     """
     print("Application startup.")
     yield
-    print("Application shutdown: Disposing database engine.")
-    await engine.dispose()
+    if _engine is not None:
+        print("Application shutdown: Disposing database engine.")
+        await _engine.dispose()
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(ServerTimingMiddleware)
+
+# In-flight computations, shared by concurrent identical requests
+singleflight = SingleFlight()
+
+# Returns fetched for recent (assets, date range) requests
+returns_cache = LRUCache(maxsize=32)
 
 # --- Dependency Injection ---
 async def get_session() -> AsyncSession:
     """
     Provides a SQLAlchemy async session for a single request.
     """
-    async with AsyncSessionLocal() as session:
+    get_engine()
+    async with _session_factory() as session:
         yield session
 
+
+def new_session() -> AsyncSession:
+    """
+    A session owned by its caller rather than by a request. Computations shared by singleflight use their own
+    session, as they must outlive the request which started them (e.g. if that client disconnects).
+    """
+    get_engine()
+    return _session_factory()
+
+
+def serialise(result) -> JSONResponse:
+    """
+    Render the response explicitly, so that serialisation is timed as its own stage.
+    """
+    with stage("serialise"):
+        return JSONResponse(jsonable_encoder(result))
+
+
+# Seconds an instance keeps serving a data version before checking the database for a newer one
+DATA_VERSION_TTL = 60
+
+
+async def load_data_version() -> Optional[str]:
+    get_engine()
+    async with _session_factory() as session:
+        try:
+            return await session.scalar(text("SELECT version FROM data_version"))
+        except DBAPIError:
+            # A database seeded before versioning has no stamp, so its responses are not cached
+            return None
+
+data_version = http_cache.DataVersion(load_data_version, ttl=DATA_VERSION_TTL)
+
+
+async def conditional(request: Request) -> Tuple[Optional[str], Optional[Response]]:
+    """
+    The ETag of a read endpoint's response, from the data version and the request URL, and a 304 response if
+    the client already holds it. Checked before any query or computation.
+    """
+    version = await data_version.get()
+    if version is None:
+        return None, None
+    tag = http_cache.etag(version, request.url.path, request.url.query)
+    if http_cache.matches(request.headers.get("if-none-match"), tag):
+        return tag, Response(status_code=304, headers=http_cache.cache_headers(tag, DATA_VERSION_TTL))
+    return tag, None
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Latency histograms and DB pool statistics, in the Prometheus text format.
+    """
+    pool = _engine.pool if _engine is not None else None
+    return Response(metrics.render_latest(pool=pool), media_type=metrics.CONTENT_TYPE)
+
 # Markowitz
 @app.get("/api/markowitz/main")
 async def markowitz_main(
+    request: Request,
     assets: List[str] = Query(...),
     start_year: int = Query(..., alias="startYear"),
     end_year: int = Query(..., alias="endYear"),
     r: float = Query(...),
     allowShortSelling: bool = Query(...),
-    session: AsyncSession = Depends(get_session)
 ):
 
   # Ensure all column names are safe
   safe_columns = [col for col in assets if col.isidentifier()]
+  set_labels(method="short-selling" if allowShortSelling else "long-only", assets=metrics.assets_bucket(len(safe_columns)))
+
+  tag, not_modified = await conditional(request)
+  if not_modified is not None:
+    return not_modified
+
+  # Concurrent identical requests share a single DB query and solve
+  key = ("markowitz", tuple(safe_columns), start_year, end_year, r, allowShortSelling)
+  result = await singleflight.do(key, lambda: compute_markowitz(safe_columns, start_year, end_year, r, allowShortSelling))
+
+  response = serialise(result)
+  response.headers.update(http_cache.cache_headers(tag, DATA_VERSION_TTL))
+  return response
+
+
+async def fetch_returns(session: AsyncSession, safe_columns: List[str], start_year: int, end_year: int) -> "pd.DataFrame":
+  """
+  Daily returns of the given tickers between the start of start_year and the end of end_year, indexed by date.
+  Tickers without a complete history over the range are dropped.
+  Results are cached in-process, per data version.
+  """
+  # The query runs up to CURRENT_DATE for the current year, so those results are only valid for today
+  today = date.today()
+  key = (await data_version.get(), tuple(safe_columns), start_year, end_year, today if end_year >= today.year else None)
+  if (rets_df := returns_cache.get(key)) is not None:
+    return rets_df
+
+  import pandas as pd
+
   column_list = ", ".join(f'"{col}"' for col in safe_columns)  # double quotes for Postgres identifiers
 
   # Use SQLAlchemy bind parameters (:start_date, :end_date)
@@ -102,30 +209,189 @@ async def markowitz_main(
     ORDER BY date
   """)
 
-  print("Fetching from db")
-  db_start = time.time()
-  rows = (await session.execute(query, {"start_year": start_year, "end_year": end_year})).all()
-  db_duration = time.time() - db_start
-  print(f"DB Query Time: {db_duration:.4f}s, rows: {len(rows)}")
-  rets = pd.DataFrame(rows, columns=['date']+safe_columns)
-  rets.set_index('date', inplace=True)
+  with stage("db"):
+    rows = (await session.execute(query, {"start_year": start_year, "end_year": end_year})).all()
+
+  with stage("dataframe"):
+    rets = pd.DataFrame(rows, columns=['date']+safe_columns)
+    rets.set_index('date', inplace=True)
+
+    # Verify all columns contain numbers, if not we discard the column
+    # This can happen if a ticker began trading after the date range
+    rets_df = rets.apply(pd.to_numeric, errors='coerce').dropna(axis=1)
+
+  returns_cache.set(key, rets_df)
+  return rets_df
 
-  # Verify all columns contain numbers, if not we discard the column
-  # This can happen if a ticker began trading after the date range
-  rets_df = rets.apply(pd.to_numeric, errors='coerce').dropna(axis=1) 
 
-  result = main(
+async def compute_markowitz(safe_columns: List[str], start_year: int, end_year: int, r: float, allowShortSelling: bool):
+  from modules.markowitz.main import main
+
+  async with new_session() as session:
+    rets_df = await fetch_returns(session, safe_columns, start_year, end_year)
+
+  # The solve runs in a worker thread, so the event loop stays free to accept (and coalesce) other requests
+  return await asyncio.to_thread(
+      main,
       list(rets_df.columns),
       rets_df.to_numpy(),
       allowShortSelling,
       R_f=r,
+      stage=stage,
   )
 
+@app.get("/api/markowitz/rolling")
+async def markowitz_rolling(
+    assets: List[str] = Query(...),
+    start_year: int = Query(..., alias="startYear"),
+    end_year: int = Query(..., alias="endYear"),
+    r: float = Query(...),
+    allowShortSelling: bool = Query(...),
+    window_years: int = Query(3, alias="windowYears", ge=1),
+    step_months: int = Query(1, alias="stepMonths", ge=1),
+):
+  """
+  The tangency portfolio, its Sharpe and Sortino ratios, and the minimum variance portfolio for each rolling
+  window of window_years, stepped forward by step_months.
+  """
+  safe_columns = [col for col in assets if col.isidentifier()]
+  set_labels(method="short-selling" if allowShortSelling else "long-only", assets=metrics.assets_bucket(len(safe_columns)))
+
+  key = ("markowitz-rolling", tuple(safe_columns), start_year, end_year, r, allowShortSelling, window_years, step_months)
+  result = await singleflight.do(key, lambda: compute_markowitz_rolling(safe_columns, start_year, end_year, r, allowShortSelling, window_years, step_months))
+
+  return serialise(result)
+
+
+async def compute_markowitz_rolling(safe_columns: List[str], start_year: int, end_year: int, r: float, allowShortSelling: bool, window_years: int, step_months: int):
+  import pandas as pd
+  from modules.markowitz.rolling import rolling_frontier
+
+  async with new_session() as session:
+    rets_df = await fetch_returns(session, safe_columns, start_year, end_year)
+  if rets_df.empty:
+    raise HTTPException(status_code=404, detail="No returns found for the requested assets and dates.")
+
+  # Row ranges [start, end) of each window, stepping the window start forward by step_months
+  dates = pd.DatetimeIndex(rets_df.index)
+  starts = pd.date_range(dates[0], dates[-1] - pd.DateOffset(years=window_years), freq=pd.DateOffset(months=step_months))
+  windows = [
+      (int(dates.searchsorted(start)), int(dates.searchsorted(start + pd.DateOffset(years=window_years))))
+      for start in starts
+  ]
+  if not windows:
+    raise HTTPException(status_code=400, detail=f"The date range is shorter than the {window_years} year window.")
+
+  with stage("solver"):
+    results = await asyncio.to_thread(rolling_frontier, rets_df.to_numpy(), windows, allowShortSelling, r)
+
+  for result in results:
+    result["start"], result["end"] = dates[result["start"]].date(), dates[result["end"] - 1].date()
+  return {"tickers": list(rets_df.columns), "windows": results}
+
+
+# The resampled frontier keeps the weights of every sample along the frontier (samples x 60 x assets floats),
+# so the product of samples and assets is bounded to keep a request within a serverless function's memory
+RESAMPLED_MAX_SAMPLE_ASSETS = 10 ** 5
+
+
+@app.get("/api/markowitz/resampled")
+async def markowitz_resampled(
+    assets: List[str] = Query(...),
+    start_year: int = Query(..., alias="startYear"),
+    end_year: int = Query(..., alias="endYear"),
+    allowShortSelling: bool = Query(...),
+    samples: int = Query(100, ge=10, le=1000),
+):
+  """
+  The resampled (Michaud) efficient frontier, with 5th-95th percentile bands on the weights.
+  """
+  safe_columns = [col for col in assets if col.isidentifier()]
+  if samples * len(safe_columns) > RESAMPLED_MAX_SAMPLE_ASSETS:
+    raise HTTPException(status_code=400, detail=f"samples x assets may be at most {RESAMPLED_MAX_SAMPLE_ASSETS}")
+  set_labels(method="short-selling" if allowShortSelling else "long-only", assets=metrics.assets_bucket(len(safe_columns)))
+
+  key = ("markowitz-resampled", tuple(safe_columns), start_year, end_year, allowShortSelling, samples)
+  result = await singleflight.do(key, lambda: compute_markowitz_resampled(safe_columns, start_year, end_year, allowShortSelling, samples))
+
+  return serialise(result)
+
+
+async def compute_markowitz_resampled(safe_columns: List[str], start_year: int, end_year: int, allowShortSelling: bool, samples: int):
+  from modules.markowitz.resampled import resampled_frontier
+
+  async with new_session() as session:
+    rets_df = await fetch_returns(session, safe_columns, start_year, end_year)
+
+  with stage("solver"):
+    return await asyncio.to_thread(
+        resampled_frontier,
+        list(rets_df.columns),
+        rets_df.to_numpy(),
+        allowShortSelling,
+        num_samples=samples,
+    )
+
+class PortfolioAnalyticsRequest(BaseModel):
+  assets: List[str]
+  startYear: int
+  endYear: int
+  r: float
+  weights: List[List[float]]
+
+
+@app.post("/api/markowitz/analytics")
+async def markowitz_analytics(
+    body: PortfolioAnalyticsRequest,
+    session: AsyncSession = Depends(get_session)
+):
+  """
+  Annualised return, volatility, Sharpe and Sortino ratios, max drawdown and historical VaR/CVaR for every row
+  of a (portfolios x assets) weight matrix, whose columns follow the order of assets.
+  """
+  if not all(col.isidentifier() for col in body.assets):
+    raise HTTPException(status_code=400, detail="Invalid asset name.")
+  if not body.weights or any(len(row) != len(body.assets) for row in body.weights):
+    raise HTTPException(status_code=400, detail="weights must be a non-empty matrix with one column per asset.")
+  set_labels(assets=metrics.assets_bucket(len(body.assets)))
+
+  import numpy as np
+  from modules.markowitz.analytics import portfolio_analytics
+
+  rets_df = await fetch_returns(session, body.assets, body.startYear, body.endYear)
+  if missing := [col for col in body.assets if col not in rets_df.columns]:
+    raise HTTPException(status_code=400, detail=f"No complete returns history over the date range for: {', '.join(missing)}")
+  if rets_df.empty:
+    raise HTTPException(status_code=400, detail="No returns over the date range.")
+
+  with stage("solver"):
+    result = await asyncio.to_thread(portfolio_analytics, rets_df[body.assets].to_numpy(), np.array(body.weights), body.r)
+
+  return serialise(result)
+
+
+async def write_table(df: "pd.DataFrame", name: str) -> None:
+    """
+    Replace a table with a DataFrame. pandas writes through a synchronous connection, which the async
+    engine provides to run_sync.
+    """
+    async with get_engine().begin() as connection:
+        await connection.run_sync(lambda sync_connection: df.to_sql(name, con=sync_connection, if_exists="replace", index_label="date"))
+
+
+async def write_data_version(version: str) -> None:
+    """
+    Replace the stored data version stamp (see load_data_version)
+    """
+    async with new_session() as session:
+        await session.execute(text("CREATE TABLE IF NOT EXISTS data_version (version text)"))
+        await session.execute(text("DELETE FROM data_version"))
+        await session.execute(text("INSERT INTO data_version (version) VALUES (:version)"), {"version": version})
+        await session.commit()
 
-  return result
 
 @app.get("/api/seed_db")
-def seed_db():
+async def seed_db():
     """
     Seeds the Turso DB from local price_history.csv and returns_history.csv.
     Assumes both files are small enough to load fully into memory.
@@ -133,7 +399,12 @@ def seed_db():
     if not app.debug:
         raise HTTPException(status_code=400, detail="Cannot seed database in production")
 
+    import pandas as pd
 
+    returns_cache.clear()
+    path_sets.clear()
+    if _pricing_grids is not None:
+        _pricing_grids.clear()
 
     print("Load and clean price_history")
     try:
@@ -143,7 +414,7 @@ def seed_db():
             for c in price_history.columns
         ]
         price_history.set_index("Date", inplace=True)
-        price_history.to_sql("price_history", con=engine, if_exists="replace", index_label="date")
+        await write_table(price_history, "price_history")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed loading price_history.csv: {e}")
 
@@ -155,9 +426,9 @@ def seed_db():
             for c in returns_history.columns
         ]
         returns_history.set_index("Date", inplace=True)
-        returns_history.to_sql("returns_history", con=engine, if_exists="replace", index_label="date")
+        await write_table(returns_history, "returns_history")
     except Exception as e:
-        return HTTPException(detail=f"Failed loading returns_history.csv: {str(e)}", status_code=400)
+        raise HTTPException(status_code=400, detail=f"Failed loading returns_history.csv: {e}")
     print("Load and clean risk_free_rate")
     try:
         risk_free_rate = pd.read_csv("../risk_free_rate.csv", parse_dates=["Date"])
@@ -166,9 +437,14 @@ def seed_db():
             for c in risk_free_rate.columns
         ]
         risk_free_rate.set_index("Date", inplace=True)
-        risk_free_rate.to_sql("risk_free_rate", con=engine, if_exists="replace", index_label="date")
+        await write_table(risk_free_rate, "risk_free_rate")
     except Exception as e:
-        return HTTPException(detail=f"Failed loading risk_free_rate.csv: {str(e)}", status_code=400)
+        raise HTTPException(status_code=400, detail=f"Failed loading risk_free_rate.csv: {e}")
+
+    # Bump the data version, which invalidates the ETags (and in-process caches) of every instance
+    version = http_cache.new_version()
+    await write_data_version(version)
+    data_version.set(version)
 
     return {"message": "Database seeded successfully"}
 
@@ -198,7 +474,9 @@ def get_market_cap(symbol):
   return symbol, yf.Ticker(symbol.replace('.', '-')).info.get('marketCap')
 
 
-def download_symbols(symbols: List[str]) -> pd.DataFrame:
+def download_symbols(symbols: List[str]) -> "pd.DataFrame":
+  import pandas as pd
+
   # Fetch market caps in parallel
   with ThreadPoolExecutor() as executor:
     market_caps = list(executor.map(get_market_cap, symbols))
@@ -219,7 +497,7 @@ def download_symbols(symbols: List[str]) -> pd.DataFrame:
 
 
 # @cache
-def get_returns(ticker: str) -> pd.Series:
+def get_returns(ticker: str) -> "pd.Series":
   # yfinance.download frequently errors, this wrapper makes downloading reliable
   for _ in range(int(1e5)):
     with ThreadPoolExecutor() as executor:
@@ -236,7 +514,7 @@ def get_returns(ticker: str) -> pd.Series:
 
 
 # @cache
-def download_data(ticker: str) -> pd.Series:
+def download_data(ticker: str) -> "pd.Series":
   """
     Downloads the adjusted close prices for a given ticker and calculates the daily returns
   """
@@ -246,6 +524,39 @@ def download_data(ticker: str) -> pd.Series:
 
 # ---------  Derivatives   ---------
 
+BINOMIAL_NUM_STEPS = int(1e3)
+
+# Per-ticker pricing grids, so that repeated binomial quotes are interpolated instead of re-running the tree
+_pricing_grids: Optional["GridCache"] = None
+
+
+def get_pricing_grids() -> "GridCache":
+    global _pricing_grids
+    if _pricing_grids is None:
+        from modules.derivatives.pricing_grid import GridCache
+        _pricing_grids = GridCache()
+    return _pricing_grids
+
+
+async def underlying_statistics(session: AsyncSession, ticker: str) -> Tuple[float, float]:
+    """
+    The spot price and annualised volatility of a ticker, from its price history.
+    """
+    import numpy as np
+
+    query = text(f'SELECT "{ticker}" FROM price_history WHERE "{ticker}" IS NOT NULL ORDER BY date')
+
+    with stage("db"):
+        result = await session.execute(query)
+        rows = result.fetchall()
+        prices = np.array([r[0] for r in rows], dtype=float)
+
+    # Calculate initial price and volatility (sigma)
+    S_0 = round(prices[-1], 2)
+    returns = prices[1:] / prices[:-1] - 1
+    sigma = np.sqrt(365) * returns.std()
+    return S_0, sigma
+
 
 # Route for option-price
 @app.get("/api/derivatives/option-price")
@@ -257,46 +568,71 @@ async def get_option_price(
     K: float = Query(...),
     ticker: str = Query(..., regex=r"^[A-Za-z_][A-Za-z0-9_]*$", description="Ticker symbol"),
     R_f: float = Query(...),
-    session: AsyncSession = Depends(get_session),
 ):
     t: datetime = datetime.now()
     if t > T:
         return HTTPException(status_code=400, detail=f"t: {t} should be less than T: {T}")
     tau = (T - t).days / 365
 
-    query = text(f'SELECT "{ticker}" FROM price_history WHERE "{ticker}" IS NOT NULL ORDER BY date')
+    set_labels(method=method, option_type=option_type)
 
-    # Timing the database query
-    db_start = time.time()
-    result = await session.execute(query)
-    rows = result.fetchall()
-    prices = np.array([r[0] for r in rows], dtype=float)
-    print(f"DB Query Time: {time.time() - db_start:.4f}s, rows: {len(prices)}")
+    # Concurrent identical requests share a single DB query and pricing run
+    key = ("option-price", option_type, method, instrument, tau, K, ticker, R_f)
+    result = await singleflight.do(key, lambda: compute_option_price(option_type, method, instrument, K, ticker, R_f, tau))
 
-    # Calculate initial price and volatility (sigma)
-    S_0 = round(prices[-1], 2)
-    returns = prices[1:] / prices[:-1] - 1
-    sigma = np.sqrt(365) * returns.std()
+    return serialise(result)
+
+
+async def compute_option_price(
+    option_type: Literal['european', 'american'],
+    method: Literal['binomial', 'black-scholes', 'monte-carlo', 'longstaff-schwartz'],
+    instrument: Literal['call', 'put'],
+    K: float, ticker: str, R_f: float, tau: float,
+):
+    async with new_session() as session:
+        S_0, sigma = await underlying_statistics(session, ticker)
 
     print("S_0: ", S_0, "sigma: ", sigma, "R_f: ", R_f, "K: ", K, "tau: ", tau,
           "method: ", method, "option_type: ", option_type, "instrument: ", instrument)
 
-    binomial_num_steps = int(1e3)
+    with stage("pricing"):
+        if method == "binomial":
+            from modules.derivatives.pricing_grid import binomial_grid
+
+            # Interpolate on the cached grid for this ticker; None until the grid is built, or if the
+            # point is outside the grid or in a cell with too large an error bound
+            grid_key = (ticker, float(sigma), R_f, option_type, instrument)
+            build = partial(binomial_grid, instrument, sigma, R_f, BINOMIAL_NUM_STEPS, option_type == "american")
+            if (result := get_pricing_grids().quote(grid_key, build, S_0, K, tau)) is not None:
+                return result
+        # The pricing kernels run in a worker thread, so the event loop stays free to accept other requests
+        return await asyncio.to_thread(price_option, option_type, method, instrument, S_0, K, tau, R_f, sigma)
+
+
+def price_option(
+    option_type: Literal['european', 'american'],
+    method: Literal['binomial', 'black-scholes', 'monte-carlo', 'longstaff-schwartz'],
+    instrument: Literal['call', 'put'],
+    S_0: float, K: float, tau: float, R_f: float, sigma: float,
+):
+    binomial_num_steps = BINOMIAL_NUM_STEPS
     binomial_num_trials = int(1e5)
     monte_carlo_num_timesteps = 100
     longstaff_schwartz_num_trials = int(1e5)
     longstaff_schwartz_num_timesteps = 100
 
-    # Timing the option price calculation
-    calc_start_time = time.time()
+    # Only the engine for the requested method is imported
     match (method, option_type):
         case "binomial", "european":
+            from modules.derivatives.binomial_model import EUPrice
             result = EUPrice(instrument, S_0, sigma, R_f, K, tau, binomial_num_steps)
 
         case "binomial", "american":
+            from modules.derivatives.binomial_model import USPrice
             result = USPrice(instrument, S_0, sigma, R_f, K, tau, binomial_num_steps)
 
         case "black-scholes", "european":
+            from modules.derivatives.black_scholes import black_scholes_option
             bs = black_scholes_option(S_0, K, tau, R_f, sigma)
             result = bs.value(instrument)
 
@@ -304,6 +640,7 @@ async def get_option_price(
             result = {"error": "American options are not supported"}
 
         case "monte-carlo", "european":
+            from modules.derivatives.monte_carlo import monte_carlo
             result = monte_carlo(
                 instrument,
                 S_0, K, tau, R_f, sigma,
@@ -316,6 +653,7 @@ async def get_option_price(
             result = {"error": "American options are not supported"}
 
         case "longstaff-schwartz", "american":
+            from modules.derivatives.longstaff_schwartz import longstaff_schwartz
             result = longstaff_schwartz(
                 instrument,
                 S_0, K, tau, R_f, sigma,
@@ -330,14 +668,187 @@ async def get_option_price(
         case _:
             raise ValueError(f"Unsupported method/option_type combination: {method!r}/{option_type!r}")
 
-    calc_duration = time.time() - calc_start_time
-    print("Calculation Time: {:.4f}s".format(calc_duration))  # Logging the calculation time
+    return result
+
+@app.get("/api/derivatives/option-greeks")
+async def get_option_greeks(
+    option_type: Literal['european', 'american'] = Query(..., alias="optionType"),
+    method: Literal['black-scholes', 'monte-carlo', 'longstaff-schwartz'] = Query(...),
+    instrument: Literal['call', 'put'] = Query(...),
+    T: datetime = Query(..., description="Exercise date in YYYY-MM-DD"),
+    K: float = Query(...),
+    ticker: str = Query(..., regex=r"^[A-Za-z_][A-Za-z0-9_]*$", description="Ticker symbol"),
+    R_f: float = Query(...),
+):
+    """
+    Price, delta, gamma, vega and rho. The simulation methods compute every Greek from one set of random numbers,
+    and also return the standard error of each estimate.
+    """
+    t: datetime = datetime.now()
+    if t > T:
+        raise HTTPException(status_code=400, detail=f"t: {t} should be less than T: {T}")
+    tau = (T - t).days / 365
+
+    set_labels(method=method, option_type=option_type)
+
+    # Concurrent identical requests share a single DB query and simulation
+    key = ("option-greeks", option_type, method, instrument, tau, K, ticker, R_f)
+    result = await singleflight.do(key, lambda: compute_option_greeks(option_type, method, instrument, K, ticker, R_f, tau))
+
+    return serialise(result)
+
+
+async def compute_option_greeks(
+    option_type: Literal['european', 'american'],
+    method: Literal['black-scholes', 'monte-carlo', 'longstaff-schwartz'],
+    instrument: Literal['call', 'put'],
+    K: float, ticker: str, R_f: float, tau: float,
+):
+    async with new_session() as session:
+        S_0, sigma = await underlying_statistics(session, ticker)
+
+    with stage("pricing"):
+        # The simulations run in a worker thread, so the event loop stays free to accept other requests
+        return await asyncio.to_thread(option_greeks, option_type, method, instrument, S_0, K, tau, R_f, sigma)
+
+
+def option_greeks(
+    option_type: Literal['european', 'american'],
+    method: Literal['black-scholes', 'monte-carlo', 'longstaff-schwartz'],
+    instrument: Literal['call', 'put'],
+    S_0: float, K: float, tau: float, R_f: float, sigma: float,
+):
+    from modules.derivatives.greeks import black_scholes_greeks, monte_carlo_greeks, longstaff_schwartz_greeks
+
+    monte_carlo_num_trials = int(1e5)
+    monte_carlo_num_timesteps = 100
+    longstaff_schwartz_num_trials = int(1e5)
+    longstaff_schwartz_num_timesteps = 100
+
+    match (method, option_type):
+        case "black-scholes", "european":
+            result = black_scholes_greeks(instrument, S_0, K, tau, R_f, sigma)
+
+        case "monte-carlo", "european":
+            result = monte_carlo_greeks(
+                instrument,
+                S_0, K, tau, R_f, sigma,
+                num_trials=monte_carlo_num_trials,
+                num_timesteps=monte_carlo_num_timesteps,
+                seed=random.randint(0, int(1e6)),
+            )
+
+        case "longstaff-schwartz", "american":
+            result = longstaff_schwartz_greeks(
+                instrument,
+                S_0, K, tau, R_f, sigma,
+                num_trials=longstaff_schwartz_num_trials,
+                num_timesteps=longstaff_schwartz_num_timesteps,
+                seed=random.randint(0, int(1e6)),
+            )
+
+        case "longstaff-schwartz", "european":
+            result = {"error": "European options are not supported"}
+
+        case _:
+            result = {"error": "American options are not supported"}
 
     return result
 
+MULTI_PRICE_NUM_TRIALS = int(1e5)
+MULTI_PRICE_NUM_TIMESTEPS = 100
+# Each payoff is evaluated over every simulated path, so a request's pricing time grows with its payoffs
+MULTI_PRICE_MAX_PAYOFFS = 200
+
+# Simulated path sets per (ticker, expiry), shared by multi-price requests whatever payoffs they ask for
+path_sets = LRUCache(maxsize=8)
+
+
+class PayoffRequest(BaseModel):
+    style: Literal['european', 'asian', 'barrier', 'lookback']
+    instrument: Literal['call', 'put']
+    K: Optional[float] = None
+    barrier: Optional[float] = None
+    barrierType: Optional[Literal['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in']] = None
+
+    @model_validator(mode="after")
+    def check_parameters(self):
+        # Lookbacks without a strike are floating strike lookbacks
+        if self.K is None and self.style != "lookback":
+            raise ValueError(f"A {self.style} payoff needs a strike K")
+        if self.style == "barrier" and (self.barrier is None or self.barrierType is None):
+            raise ValueError("A barrier payoff needs a barrier and a barrierType")
+        return self
+
+
+class MultiPriceRequest(BaseModel):
+    ticker: str
+    T: datetime
+    R_f: float
+    payoffs: List[PayoffRequest] = Field(..., min_length=1, max_length=MULTI_PRICE_MAX_PAYOFFS)
+
+
+async def simulated_paths(ticker: str, S_0: float, sigma: float, R_f: float, tau: float):
+    """
+    Path statistics of one simulation per (ticker, expiry), cached and shared by concurrent requests.
+    """
+    from modules.derivatives.monte_carlo import simulate_path_statistics
+
+    key = (ticker, S_0, float(sigma), R_f, tau)
+    if (paths := path_sets.get(key)) is None:
+        paths = await singleflight.do(("paths",) + key, lambda: asyncio.to_thread(
+            simulate_path_statistics,
+            S_0, tau, R_f, sigma,
+            num_trials=MULTI_PRICE_NUM_TRIALS,
+            seed=random.randint(0, int(1e6)),
+            num_timesteps=MULTI_PRICE_NUM_TIMESTEPS,
+        ))
+        path_sets.set(key, paths)
+    return paths
+
+
+@app.post("/api/derivatives/multi-price")
+async def get_multi_price(
+    body: MultiPriceRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Prices of many payoffs on one underlying and expiry (calls and puts across strikes, Asian, barrier and
+    lookback options), all evaluated on a single Monte Carlo simulation.
+    """
+    if not body.ticker.isidentifier():
+        raise HTTPException(status_code=400, detail="Invalid ticker.")
+    t: datetime = datetime.now()
+    if t > body.T:
+        raise HTTPException(status_code=400, detail=f"t: {t} should be less than T: {body.T}")
+    tau = (body.T - t).days / 365
+
+    set_labels(method="monte-carlo")
+    S_0, sigma = await underlying_statistics(session, body.ticker)
+
+    from modules.derivatives.monte_carlo import price_payoffs
+
+    payoffs = [
+        {"style": p.style, "option_type": p.instrument}
+        | ({"K": p.K} if p.K is not None else {})
+        | ({"barrier": p.barrier, "barrier_type": p.barrierType} if p.style == "barrier" else {})
+        for p in body.payoffs
+    ]
+    with stage("pricing"):
+        paths = await simulated_paths(body.ticker, S_0, sigma, body.R_f, tau)
+        # Like the simulation, the payoffs are evaluated in a worker thread, so the event loop stays free
+        prices = await asyncio.to_thread(price_payoffs, payoffs, paths, body.R_f, tau)
+
+    return serialise({"S_0": S_0, "sigma": sigma, "prices": prices})
+
 # ---------  Utility Functions   ---------
 @app.get("/api/risk_free_rate")
-async def risk_free_rate(session: AsyncSession = Depends(get_session)):
+async def risk_free_rate(request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    tag, not_modified = await conditional(request)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(http_cache.cache_headers(tag, DATA_VERSION_TTL))
+
     query = text('SELECT "Adj Close" FROM risk_free_rate ORDER BY date DESC LIMIT 1')
     rate = await session.scalar(query)
     if rate is None:
@@ -346,7 +857,12 @@ async def risk_free_rate(session: AsyncSession = Depends(get_session)):
 
 
 @app.get("/api/assets")
-async def assets(session: AsyncSession = Depends(get_session)):
+async def assets(request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    tag, not_modified = await conditional(request)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(http_cache.cache_headers(tag, DATA_VERSION_TTL))
+
     query = text(
         "SELECT column_name FROM information_schema.columns "
         "WHERE table_name='price_history' AND column_name <> 'date' "
@@ -360,9 +876,16 @@ async def assets(session: AsyncSession = Depends(get_session)):
 
 @app.get("/api/underlying_price/{ticker}")
 async def underlying_price( 
+    request: Request,
+    response: Response,
     ticker: str = Path(..., regex=r"^[a-zA-Z_][a-zA-Z0-9_]*$"),
     session: AsyncSession = Depends(get_session),
 ):
+    tag, not_modified = await conditional(request)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(http_cache.cache_headers(tag, DATA_VERSION_TTL))
+
     # The isidentifier() check is crucial to prevent SQL injection
     query = text(f'SELECT "{ticker}" FROM price_history ORDER BY date DESC LIMIT 1')
     price = await session.scalar(query)
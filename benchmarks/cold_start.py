@@ -0,0 +1,165 @@
+"""
+  Cold-start benchmark for the API entry point (api/index.py).
+
+  Every measurement runs in a fresh interpreter, as a serverless cold start would: the process imports the
+  app, and then serves a single request through an in-process ASGI client. For each route it reports the
+  import time, the latency of the first request (with its Server-Timing stages), and which of the heavy
+  libraries were loaded by the import and by the request. The slowest top-level imports are also listed,
+  from `python -X importtime`.
+
+  Requests go to the database configured by DB_CONNECTION_STRING (or api/.env), as in development.
+  Requires httpx, from requirements-dev.txt.
+
+  Usage (from the repository root):
+    python -m benchmarks.cold_start                    # all routes, median of 3 cold starts each
+    python -m benchmarks.cold_start -k derivatives     # only routes whose name contains this string
+    python -m benchmarks.cold_start --repeats 5 --json cold_start.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, "api")
+
+# Libraries whose import dominates cold starts
+HEAVY_MODULES = ["numpy", "pandas", "cvxopt", "sqlalchemy", "asyncpg"]
+
+# Routes timed by default: (name, path)
+ROUTES: List[Tuple[str, str]] = [
+    ("metrics", "/metrics"),
+    ("risk_free_rate", "/api/risk_free_rate"),
+    ("assets", "/api/assets"),
+    ("underlying_price", "/api/underlying_price/AAPL"),
+    ("markowitz/main", "/api/markowitz/main?assets=AAPL&assets=MSFT&assets=JNJ&startYear=2015&endYear=2020&r=0.05&allowShortSelling=true"),
+    ("markowitz/rolling", "/api/markowitz/rolling?assets=AAPL&assets=MSFT&assets=JNJ&startYear=2015&endYear=2020&r=0.05&allowShortSelling=true"),
+    ("derivatives/binomial", "/api/derivatives/option-price?optionType=american&method=binomial&instrument=put&T=2030-01-01&K=150&ticker=AAPL&R_f=0.05"),
+    ("derivatives/black-scholes", "/api/derivatives/option-price?optionType=european&method=black-scholes&instrument=call&T=2030-01-01&K=150&ticker=AAPL&R_f=0.05"),
+    ("derivatives/monte-carlo", "/api/derivatives/option-price?optionType=european&method=monte-carlo&instrument=call&T=2030-01-01&K=150&ticker=AAPL&R_f=0.05"),
+    ("derivatives/greeks", "/api/derivatives/option-greeks?optionType=european&method=black-scholes&instrument=call&T=2030-01-01&K=150&ticker=AAPL&R_f=0.05"),
+]
+
+
+def probe(path: Optional[str]) -> Dict[str, Any]:
+  """
+    Runs in the fresh interpreter: import the app, then (if path is given) serve one GET request.
+    The ASGI client is imported first, so that its own import is not counted against the app.
+  """
+  import asyncio
+  import httpx
+
+  sys.path[:0] = [ROOT_DIR, API_DIR]
+  start = time.perf_counter()
+  index = __import__("index")
+  result: Dict[str, Any] = {
+      "import_time": time.perf_counter() - start,
+      "import_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+  }
+  if path is None:
+    return result
+
+  async def request():
+    transport = httpx.ASGITransport(app=index.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+      start = time.perf_counter()
+      response = await client.get(path)
+      return time.perf_counter() - start, response
+
+  latency, response = asyncio.run(request())
+  result.update({
+      "latency": latency,
+      "status": response.status_code,
+      "server_timing": response.headers.get("server-timing", ""),
+      "request_modules": [m for m in HEAVY_MODULES if m in sys.modules and m not in result["import_modules"]],
+  })
+  return result
+
+
+def cold_start(path: Optional[str], python_args: List[str] = []) -> Tuple[Dict[str, Any], str]:
+  """
+    Run probe(path) in a new interpreter, returning its result and stderr
+  """
+  command = [sys.executable, *python_args, "-m", "benchmarks.cold_start", "--probe"] + ([path] if path is not None else [])
+  process = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+  if process.returncode != 0:
+    raise RuntimeError(f"Cold start of {path or 'import'} failed:\n{process.stderr}")
+  return json.loads(process.stdout.strip().splitlines()[-1]), process.stderr
+
+
+def slowest_imports(importtime_log: str, limit: int) -> List[Tuple[str, float]]:
+  """
+    The modules imported directly by api/index.py with the largest cumulative import time, from the log of
+    python -X importtime. The log lists each import after its nested imports, which are indented by level.
+  """
+  children: List[Tuple[str, float]] = []
+  for line in importtime_log.splitlines():
+    if not line.startswith("import time:") or "cumulative" in line:
+      continue
+    _, cumulative, name = line[len("import time:"):].split("|")
+    level = (len(name) - len(name.lstrip()) - 1) // 2
+    if level == 1:
+      children.append((name.strip(), int(cumulative) / 1e6))
+    elif level == 0:
+      if name.strip() == "index":
+        return sorted(children, key=lambda item: item[1], reverse=True)[:limit]
+      children = []
+  return []
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Benchmark cold starts of the API entry point.")
+  parser.add_argument("--repeats", type=int, default=3, help="Cold starts per route; the median is reported.")
+  parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list.")
+  parser.add_argument("-k", dest="filter", default=None, help="Only run routes whose name contains this string.")
+  parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this path.")
+  parser.add_argument("--probe", nargs="?", const="", default=None, help=argparse.SUPPRESS)
+  return parser.parse_args(argv)
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+  args = parse_args(argv)
+  if args.probe is not None:
+    print(json.dumps(probe(args.probe or None)))
+    return 0
+  if importlib.util.find_spec("httpx") is None:
+    print("The cold-start benchmark needs httpx: pip install -r requirements-dev.txt", file=sys.stderr)
+    return 2
+
+  imports, log = cold_start(None, ["-X", "importtime"])
+  print(f"import index: {imports['import_time'] * 1e3:.0f} ms, loads {', '.join(imports['import_modules']) or 'no heavy modules'}")
+  print("slowest imports:")
+  for name, seconds in slowest_imports(log, args.top):
+    print(f"  {seconds * 1e3:8.1f} ms  {name}")
+  print()
+
+  results: Dict[str, Any] = {"import": imports, "routes": {}}
+  header = f"{'route':<28}{'status':>7}{'import (ms)':>13}{'first request (ms)':>20}  loaded by request / server-timing"
+  print(header)
+  print("-" * len(header))
+  for name, path in ROUTES:
+    if args.filter and args.filter not in name:
+      continue
+    runs = [cold_start(path)[0] for _ in range(args.repeats)]
+    import_time = statistics.median(r["import_time"] for r in runs)
+    latency = statistics.median(r["latency"] for r in runs)
+    last = runs[-1]
+    results["routes"][name] = {"path": path, "import_time": import_time, "latency": latency, "status": last["status"],
+                               "request_modules": last["request_modules"], "server_timing": last["server_timing"]}
+    print(f"{name:<28}{last['status']:>7}{import_time * 1e3:>13.0f}{latency * 1e3:>20.0f}  "
+          f"{', '.join(last['request_modules']) or '-'} / {last['server_timing']}")
+
+  if args.json_path:
+    with open(args.json_path, "w") as f:
+      json.dump(results, f, indent=2)
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(run())
@@ -0,0 +1,339 @@
+"""
+  Benchmark suite for the pricing and portfolio kernels.
+
+  Each case is timed (the median over rounds of calls, repeated until a time budget is spent), profiled for
+  peak memory with tracemalloc and, for the pricing kernels, compared against a reference price. Results can
+  be stored as a baseline, and later runs fail (exit code 1) when a case regresses beyond a threshold against
+  that baseline. Without a baseline nothing is compared; a missing --baseline given explicitly is an error.
+
+  Usage (from the repository root):
+    python -m benchmarks.kernels                    # run and compare against benchmarks/baseline.json
+    python -m benchmarks.kernels --save-baseline    # run and store the results as the new baseline
+    python -m benchmarks.kernels --quick            # smaller sweeps, useful while iterating
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from modules.derivatives.binomial_model import EUPrice, USPrice
+from modules.derivatives.black_scholes import black_scholes_option
+from modules.derivatives.greeks import longstaff_schwartz_greeks
+from modules.derivatives.longstaff_schwartz import longstaff_schwartz
+from modules.derivatives.monte_carlo import monte_carlo, simulate_path_statistics, price_payoffs
+from modules.markowitz.main import main, efficient_frontier, efficient_frontier_numerical
+from modules.markowitz.rolling import rolling_frontier
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Reference contract used by all pricing cases
+S_0, K, TAU, R, SIGMA = 100.0, 100.0, 1.0, 0.05, 0.2
+SEED = 1234
+
+# Number of trading days of synthetic returns used by the portfolio cases (10 years, so Sigma is
+# non-singular even for the largest universe)
+NUM_DAYS = 2520
+
+# Each case is timed in rounds of calls lasting at least 0.2s (timeit's autorange), repeated until the time
+# budget is spent and at least MIN_ROUNDS rounds ran
+TIME_BUDGET = 1.0
+MIN_ROUNDS = 3
+
+# A case which regresses is measured again up to this many times, and only reported if every measurement
+# regressed: on a shared machine, slowdowns can last longer than a case's time budget
+RETRIES = 2
+
+
+@dataclass
+class Case:
+  name: str
+  params: Dict[str, Any]
+  run: Callable[[], Any]
+  reference: Optional[float] = None
+
+  @property
+  def id(self) -> str:
+    return self.name + "[" + ",".join(f"{k}={v}" for k, v in self.params.items()) + "]"
+
+
+@dataclass
+class Result:
+  id: str
+  time: float
+  peak_memory: int
+  error: Optional[float] = None
+  regressions: List[str] = field(default_factory=list)
+
+
+@cache
+def european_reference(instrument: str) -> float:
+  return black_scholes_option(S_0, K, TAU, R, SIGMA).value(instrument)
+
+
+@cache
+def american_reference(instrument: str) -> float:
+  # A very fine tree is used as the reference for American options
+  return USPrice(instrument, S_0, SIGMA, R, K, TAU, 10_000)
+
+
+@cache
+def american_gamma_reference(instrument: str, K: float, tau: float, steps: int = 5000) -> float:
+  """
+    Gamma of an American option from the nodes two steps into a fine CRR tree. Unlike a second difference
+    of tree prices at bumped spots, this does not pick up the tree's oscillation in S_0.
+  """
+  dt = tau / steps
+  u = np.exp(SIGMA * np.sqrt(dt))
+  p = (np.exp(R * dt) - 1 / u) / (u - 1 / u)
+  payoff = (lambda S: np.maximum(S - K, 0)) if instrument == "call" else (lambda S: np.maximum(K - S, 0))
+  V = payoff(S_0 * u ** (2 * np.arange(steps + 1) - steps))
+  for n in range(steps - 1, 1, -1):
+    S = S_0 * u ** (2 * np.arange(n + 1) - n)
+    V = np.maximum(np.exp(-R * dt) * (p * V[1:] + (1 - p) * V[:-1]), payoff(S))
+  S = S_0 * u ** np.array([-2, 0, 2])
+  return ((V[2] - V[1]) / (S[2] - S[1]) - (V[1] - V[0]) / (S[1] - S[0])) / (0.5 * (S[2] - S[0]))
+
+
+@cache
+def synthetic_returns(num_assets: int, num_days: int = NUM_DAYS, seed: int = SEED) -> np.ndarray:
+  """
+    Daily returns from a one factor model, so that assets are realistically correlated
+  """
+  rng = np.random.default_rng(seed)
+  betas = rng.uniform(0.5, 1.5, num_assets)
+  alphas = rng.normal(0.0003, 0.0002, num_assets)
+  market = rng.normal(0.0003, 0.01, num_days)
+  idiosyncratic = rng.normal(0, 0.015, (num_days, num_assets))
+  return alphas + market[:, None] * betas + idiosyncratic
+
+
+def moments(num_assets: int):
+  rets = synthetic_returns(num_assets)
+  mu = 252 * np.mean(rets, axis=0)
+  Sigma = 252 * np.cov(rets, rowvar=False)
+  return rets, mu, Sigma
+
+
+def pricing_cases(quick: bool) -> List[Case]:
+  steps = [100, 500, 1000] if quick else [100, 500, 1000, 2000]
+  trials = [1_000, 10_000] if quick else [1_000, 10_000, 100_000]
+  cases: List[Case] = []
+
+  cases.append(Case(
+      "black_scholes_option", {"instrument": "call"},
+      lambda: black_scholes_option(S_0, K, TAU, R, SIGMA).value("call"),
+      reference=european_reference("call"),
+  ))
+  for n in steps:
+    cases.append(Case(
+        "EUPrice", {"instrument": "call", "steps": n},
+        lambda n=n: EUPrice("call", S_0, SIGMA, R, K, TAU, n),
+        reference=european_reference("call"),
+    ))
+    cases.append(Case(
+        "USPrice", {"instrument": "put", "steps": n},
+        lambda n=n: USPrice("put", S_0, SIGMA, R, K, TAU, n),
+        reference=american_reference("put"),
+    ))
+  for n in trials:
+    cases.append(Case(
+        "monte_carlo", {"instrument": "call", "trials": n, "timesteps": 100},
+        lambda n=n: monte_carlo("call", S_0, K, TAU, R, SIGMA, num_trials=n, seed=SEED, num_timesteps=100),
+        reference=european_reference("call"),
+    ))
+    cases.append(Case(
+        "longstaff_schwartz", {"instrument": "put", "trials": n, "timesteps": 100},
+        lambda n=n: longstaff_schwartz("put", S_0, K, TAU, R, SIGMA, num_trials=n, seed=SEED, num_timesteps=100),
+        reference=american_reference("put"),
+    ))
+    # A chain of vanilla and exotic payoffs, all priced on one simulation
+    cases.append(Case(
+        "multi_payoff", {"payoffs": len(option_chain()), "trials": n, "timesteps": 100},
+        lambda n=n: price_payoffs(option_chain(), simulate_path_statistics(S_0, TAU, R, SIGMA, num_trials=n, seed=SEED, num_timesteps=100), R, TAU),
+    ))
+  # LSM gamma across moneyness and expiry, against a fine tree
+  for strike, tau in [(90.0, 0.1), (100.0, 0.05), (110.0, 0.25), (100.0, 1.0), (120.0, 1.0)]:
+    cases.append(Case(
+        "longstaff_schwartz_gamma", {"instrument": "put", "K": strike, "tau": tau, "trials": trials[-1]},
+        lambda strike=strike, tau=tau: longstaff_schwartz_greeks("put", S_0, strike, tau, R, SIGMA, num_trials=trials[-1], seed=SEED)["gamma"],
+        reference=american_gamma_reference("put", strike, tau),
+    ))
+  return cases
+
+
+def option_chain():
+  strikes = np.linspace(0.8 * K, 1.2 * K, 9)
+  return (
+      [{"style": "european", "option_type": t, "K": k} for t in ("call", "put") for k in strikes]
+      + [{"style": "asian", "option_type": t, "K": k} for t in ("call", "put") for k in strikes]
+      + [{"style": "barrier", "option_type": "call", "K": k, "barrier": 1.3 * K, "barrier_type": b} for k in strikes for b in ("up-and-out", "up-and-in")]
+      + [{"style": "lookback", "option_type": t} for t in ("call", "put")]
+  )
+
+
+def portfolio_cases(quick: bool) -> List[Case]:
+  universes = [5, 50, 100] if quick else [5, 50, 100, 250, 500]
+  cases: List[Case] = []
+  for n in universes:
+    rets, mu, Sigma = moments(n)
+    inv_Sigma = np.linalg.inv(Sigma)
+    tickers = [f"A{i}" for i in range(n)]
+    R_p_linspace = np.linspace(np.min(mu), np.max(mu), num=60)
+
+    cases.append(Case(
+        "efficient_frontier", {"assets": n},
+        lambda mu=mu, inv_Sigma=inv_Sigma, R_p_linspace=R_p_linspace: efficient_frontier(mu, inv_Sigma, R_p_linspace),
+    ))
+    cases.append(Case(
+        "efficient_frontier_numerical", {"assets": n},
+        lambda mu=mu, Sigma=Sigma, R_p_linspace=R_p_linspace: efficient_frontier_numerical(mu, Sigma, R_p_linspace),
+    ))
+    for allow_short_selling in (True, False):
+      cases.append(Case(
+          "main", {"assets": n, "allowShortSelling": allow_short_selling},
+          lambda tickers=tickers, rets=rets, s=allow_short_selling: main(tickers, rets, s, R_f=R),
+      ))
+    # 3 year windows stepped monthly
+    windows = [(start, start + 756) for start in range(0, NUM_DAYS - 756 + 1, 21)]
+    cases.append(Case(
+        "rolling_frontier", {"assets": n, "windows": len(windows)},
+        lambda rets=rets, windows=windows: rolling_frontier(rets, windows, True, R),
+    ))
+  return cases
+
+
+def measure(case: Case, budget: float = TIME_BUDGET) -> Result:
+  """
+    The time of a case is the median time per call over rounds of calls. A round is long enough for the
+    timer's resolution not to matter, and the median over a fixed budget of rounds (rather than the best of
+    a few calls) keeps scheduling noise on 10-100ms kernels below the regression threshold.
+  """
+  # Warm up (imports, caches and BLAS thread pools)
+  value = case.run()
+  gc.collect()
+  timer = timeit.Timer(case.run)
+  number, elapsed = timer.autorange()
+  rounds = max(MIN_ROUNDS, math.ceil(budget / elapsed))
+  times = [t / number for t in timer.repeat(repeat=rounds, number=number)]
+
+  # Peak memory is measured in a separate run, since tracing slows the kernel down
+  gc.collect()
+  tracemalloc.start()
+  case.run()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  error = None if case.reference is None else abs(float(value) - case.reference)
+  return Result(case.id, statistics.median(times), peak, error)
+
+
+def compare(result: Result, baseline: Dict[str, Any], threshold: float, time_tolerance: float, error_tolerance: float) -> None:
+  """
+    Record a regression when time or peak memory grow by more than `threshold` (relative), or the pricing
+    error grows by more than `threshold`. The absolute tolerances keep timer and sampling noise on very
+    fast or very accurate cases from being reported.
+  """
+  if (base := baseline.get(result.id)) is None:
+    return
+  if result.time > base["time"] * (1 + threshold) + time_tolerance:
+    result.regressions.append(f"time {base['time']:.4g}s -> {result.time:.4g}s")
+  if result.peak_memory > base["peak_memory"] * (1 + threshold):
+    result.regressions.append(f"memory {base['peak_memory']} -> {result.peak_memory} bytes")
+  if result.error is not None and base.get("error") is not None:
+    if result.error > base["error"] * (1 + threshold) + error_tolerance:
+      result.regressions.append(f"error {base['error']:.4g} -> {result.error:.4g}")
+
+
+def format_bytes(n: int) -> str:
+  for unit in ("B", "KiB", "MiB", "GiB"):
+    if n < 1024:
+      return f"{n:.0f}{unit}"
+    n /= 1024
+  return f"{n:.1f}TiB"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Benchmark the pricing and portfolio kernels.")
+  parser.add_argument("--baseline", default=None, help="Path of the stored baseline (JSON, default benchmarks/baseline.json).")
+  parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+  parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative regression (default 0.25).")
+  parser.add_argument("--time-tolerance", type=float, default=2e-3, help="Absolute slack on time, in seconds.")
+  parser.add_argument("--time-budget", type=float, default=TIME_BUDGET, help="Seconds spent timing each case.")
+  parser.add_argument("--retries", type=int, default=RETRIES, help="Measurements of a regressed case before it is reported.")
+  parser.add_argument("--error-tolerance", type=float, default=1e-3, help="Absolute slack on pricing error.")
+  parser.add_argument("--quick", action="store_true", help="Run smaller sweeps.")
+  parser.add_argument("-k", dest="filter", default=None, help="Only run cases whose id contains this string.")
+  parser.add_argument("--json", dest="json_path", default=None, help="Also write the results to this path.")
+  return parser.parse_args(argv)
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+  args = parse_args(argv)
+  baseline_path = args.baseline or BASELINE_PATH
+
+  baseline: Dict[str, Any] = {}
+  if not args.save_baseline:
+    if os.path.exists(baseline_path):
+      with open(baseline_path) as f:
+        baseline = json.load(f)
+    elif args.baseline is not None:
+      print(f"Baseline {args.baseline} does not exist; run with --save-baseline to create it.", file=sys.stderr)
+      return 2
+
+  cases = pricing_cases(args.quick) + portfolio_cases(args.quick)
+  if args.filter:
+    cases = [case for case in cases if args.filter in case.id]
+
+  results: List[Result] = []
+  print(f"{'case':<72} {'time':>10} {'peak mem':>10} {'error':>10}")
+  for case in cases:
+    result = measure(case, args.time_budget)
+    compare(result, baseline, args.threshold, args.time_tolerance, args.error_tolerance)
+    for _ in range(args.retries):
+      if not result.regressions:
+        break
+      retry = measure(case, args.time_budget)
+      compare(retry, baseline, args.threshold, args.time_tolerance, args.error_tolerance)
+      result = min(result, retry, key=lambda r: (len(r.regressions), r.time))
+    results.append(result)
+    error = "" if result.error is None else f"{result.error:.2e}"
+    flag = "  REGRESSION: " + "; ".join(result.regressions) if result.regressions else ""
+    print(f"{result.id:<72} {result.time:>9.4f}s {format_bytes(result.peak_memory):>10} {error:>10}{flag}")
+
+  records = {r.id: {"time": r.time, "peak_memory": r.peak_memory, "error": r.error} for r in results}
+  if args.json_path:
+    with open(args.json_path, "w") as f:
+      json.dump(records, f, indent=2)
+  if args.save_baseline:
+    # Merge, so that a filtered run only replaces the cases it ran
+    stored = {}
+    if os.path.exists(baseline_path):
+      with open(baseline_path) as f:
+        stored = json.load(f)
+    with open(baseline_path, "w") as f:
+      json.dump(stored | records, f, indent=2)
+    print(f"Baseline saved to {baseline_path}")
+    return 0
+
+  if not baseline:
+    print(f"No baseline found at {baseline_path}, so no regressions were checked; run with --save-baseline to create one.")
+  regressed = [r for r in results if r.regressions]
+  if regressed:
+    print(f"{len(regressed)} case(s) regressed beyond {args.threshold:.0%}")
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(run())
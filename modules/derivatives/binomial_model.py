@@ -96,3 +96,30 @@ def USPrice(instrument: OptionType, S_0: float, sigma: float, r: float, K: float
       C = np.maximum(C, option_payoff(S, K, instrument))
 
     return C[0]
+
+
+def strike_vector_price(instrument: OptionType, S_0: float, sigma: float, r: float, K: NDArray[np.float64], tau: float, N: int, american: bool) -> NDArray[np.float64]:
+  """
+    Price options on a vector of strikes with a single tree, vectorizing the backward recursion over strikes.
+    Uses the same tree as EUPrice/USPrice, so each element matches the scalar price for that strike.
+  """
+  dt = tau / N
+  discount_factor = np.exp(-r * dt)
+  temp1 = np.exp((r + sigma ** 2) * dt)
+  temp2 = 0.5 * (discount_factor + temp1)
+
+  u: float = temp2 + np.sqrt(temp2 * temp2 - 1)
+  d: float = 1 / u
+  p: float = (np.exp(r * dt) - d) / (u - d)
+
+  # Rows are tree nodes, columns are strikes
+  S = S_0 * d ** np.arange(N, -1, -1) * u ** np.arange(N + 1)
+  C = option_payoff(S[:, None], K[None, :], instrument)
+
+  for i in range(N - 1, -1, -1):
+    C = discount_factor * (p * C[1:i+2] + (1 - p) * C[0:i+1])
+    if american:
+      S = S_0 * d ** np.arange(i, -1, -1) * u ** np.arange(i + 1)
+      C = np.maximum(C, option_payoff(S[:, None], K[None, :], instrument))
+
+  return C[0]
@@ -1,6 +1,6 @@
 import numpy as np
 import math
-from typing import Literal
+from typing import Literal, Tuple
 
 type OptionType = Literal['call', 'put']
 
@@ -19,20 +19,39 @@ def gen_sn(num_timesteps: int, num_trials: int, anti_paths: bool = True, mo_matc
   return sn
 
 
-def longstaff_schwartz(option_type: OptionType, S_0: float, K: float,  tau: float, r: float, sigma: float, num_trials: int = 100, seed: int = 1234, num_timesteps: int = 100) -> float:
+def simulate_paths(S_0: float, tau: float, r: float, sigma: float, sn: np.ndarray) -> np.ndarray:
   """
-    Valuation of American option in Black-Scholes-Merton by least squares Monte Carlo (LSM) algorithm
+    Simulate geometric Brownian motion paths from the standard normals `sn` (one row per timestep)
   """
-  np.random.seed(seed)
+  num_timesteps = sn.shape[0] - 1
   dt = tau / num_timesteps
-  df = np.exp(-r * dt)
-  S = np.zeros((num_timesteps + 1, num_trials))
+  S = np.zeros(sn.shape)
   S[0] = S_0
-  sn = gen_sn(num_timesteps, num_trials)
-
   for t in range(1, num_timesteps + 1):
     S[t] = S[t - 1] * np.exp((r - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * sn[t])
+  return S
+
 
+def fit_quadratic(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+  """
+    Least squares fit of a quadratic, returning coefficients in np.polyval order.
+    Equivalent to np.polyfit(x, y, 2), but solves the 3x3 normal equations directly, which is several times
+    faster for the long vectors used here. x is rescaled to keep the equations well conditioned.
+  """
+  scale = np.abs(x).max() or 1.0
+  xs = x / scale
+  X = np.vstack([xs * xs, xs, np.ones_like(xs)])
+  a, b, c = np.linalg.solve(X @ X.T, X @ y)
+  return np.array([a / scale ** 2, b / scale, c])
+
+
+def lsm_cashflows(option_type: OptionType, S: np.ndarray, K: float, df: float) -> Tuple[np.ndarray, np.ndarray]:
+  """
+    Backward induction of the LSM algorithm over simulated paths S (one row per timestep).
+    Returns the cashflow of each path discounted to time zero, and the timestep at which it is exercised
+    (the last timestep for paths which are never exercised, whose cashflow is zero).
+  """
+  num_timesteps = S.shape[0] - 1
   if option_type == 'call':
     h = np.maximum(S - K, 0)
   elif option_type == 'put':
@@ -40,11 +59,35 @@ def longstaff_schwartz(option_type: OptionType, S_0: float, K: float,  tau: floa
   else:
     raise ValueError("Invalid option type. Choose either 'call' or 'put'")
 
-  # LSM algorithm
   V = np.copy(h)
+  exercise_step = np.full(S.shape[1], num_timesteps)
   for t in range(num_timesteps - 1, 0, -1):
-    reg = np.polyfit(S[t], V[t + 1] * df, 2)
-    C = np.polyval(reg, S[t])
-    V[t] = np.where(h[t] > C, h[t], V[t + 1] * df)
+    V[t] = V[t + 1] * df
+    # Only paths in the money can be exercised, so the continuation value is regressed over those alone
+    itm = h[t] > 0
+    if itm.sum() > 2:
+      reg = fit_quadratic(S[t, itm], V[t, itm])
+      exercise = itm.copy()
+      exercise[itm] = h[t, itm] > np.polyval(reg, S[t, itm])
+      V[t, exercise] = h[t, exercise]
+      exercise_step[exercise] = t
+  return V[1] * df, exercise_step
+
+
+def lsm_backward(option_type: OptionType, S: np.ndarray, K: float, df: float) -> float:
   # MCS estimator
-  return np.mean(V[1] * df)
+  return np.mean(lsm_cashflows(option_type, S, K, df)[0])
+
+
+def longstaff_schwartz(option_type: OptionType, S_0: float, K: float,  tau: float, r: float, sigma: float, num_trials: int = 100, seed: int = 1234, num_timesteps: int = 100) -> float:
+  """
+    Valuation of American option in Black-Scholes-Merton by least squares Monte Carlo (LSM) algorithm
+  """
+  np.random.seed(seed)
+  dt = tau / num_timesteps
+  df = np.exp(-r * dt)
+  sn = gen_sn(num_timesteps, num_trials)
+  S = simulate_paths(S_0, tau, r, sigma, sn)
+
+  # LSM algorithm
+  return lsm_backward(option_type, S, K, df)
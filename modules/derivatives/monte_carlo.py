@@ -1,7 +1,8 @@
 import math
 
 import numpy as np
-from typing import Literal
+from numpy.typing import NDArray
+from typing import List, Literal, NotRequired, TypedDict
 
 
 def norm_cdf(x: float) -> float:
@@ -13,6 +14,129 @@ def norm_pdf(x: float) -> float:
 
 
 type OptionType = Literal['call', 'put']
+type PayoffStyle = Literal['european', 'asian', 'barrier', 'lookback']
+type BarrierType = Literal['up-and-out', 'up-and-in', 'down-and-out', 'down-and-in']
+
+
+class PathStatistics(TypedDict):
+  """
+    Per-path statistics of a simulated path set, from which every supported payoff is evaluated.
+    average, maximum and minimum are None unless the paths were simulated with path_dependent=True.
+  """
+  S_T: NDArray[np.float64]
+  average: NDArray[np.float64] | None
+  maximum: NDArray[np.float64] | None
+  minimum: NDArray[np.float64] | None
+
+
+class Payoff(TypedDict):
+  """
+    - european: max(S_T - K, 0) for a call, max(K - S_T, 0) for a put
+    - asian: the european payoff on the arithmetic average of the price over the monitoring dates
+    - barrier: the european payoff, knocked in or out by the price crossing `barrier` on a monitoring date
+    - lookback: with K, the european payoff on the maximum (call) or minimum (put) price; without K, the
+      floating strike payoff S_T - minimum (call) or maximum - S_T (put)
+  """
+  style: PayoffStyle
+  option_type: OptionType
+  K: NotRequired[float]
+  barrier: NotRequired[float]
+  barrier_type: NotRequired[BarrierType]
+
+
+class PayoffPrice(TypedDict):
+  price: float
+  standard_error: float
+
+
+def simulate_path_statistics(S_0: float, tau: float, r: float, sigma: float, num_trials: int = 100, seed: int = 1234, num_timesteps: int = 100, path_dependent: bool = True) -> PathStatistics:
+  """
+    Simulate GBM paths, keeping only running statistics of each path rather than the full path set.
+
+    The paths are generated one timestep at a time, so memory is O(num_trials) instead of
+    O(num_timesteps * num_trials). The random numbers are drawn in the same order as a single
+    (num_timesteps x num_trials) draw, so for a given seed the paths are those of `monte_carlo`.
+    The monitoring dates of the path-dependent statistics are the simulation timesteps, and the running
+    maximum and minimum also include S_0.
+  """
+  dt = tau / num_timesteps
+  nudt = (r - 0.5 * sigma ** 2) * dt
+  volsdt = sigma * np.sqrt(dt)
+
+  np.random.seed(seed)
+  lnS_t = np.full(num_trials, np.log(S_0))
+  if path_dependent:
+    total = np.zeros(num_trials)
+    maximum = np.full(num_trials, float(S_0))
+    minimum = np.full(num_trials, float(S_0))
+  for _ in range(num_timesteps):
+    lnS_t += nudt + volsdt * np.random.normal(size=num_trials)
+    if path_dependent:
+      S_t = np.exp(lnS_t)
+      total += S_t
+      np.maximum(maximum, S_t, out=maximum)
+      np.minimum(minimum, S_t, out=minimum)
+
+  if not path_dependent:
+    return {"S_T": np.exp(lnS_t), "average": None, "maximum": None, "minimum": None}
+  return {"S_T": S_t, "average": total / num_timesteps, "maximum": maximum, "minimum": minimum}
+
+
+def vanilla(option_type: OptionType, S: NDArray[np.float64], K: float) -> NDArray[np.float64]:
+  if option_type == 'call':
+    return np.maximum(S - K, 0)
+  elif option_type == 'put':
+    return np.maximum(K - S, 0)
+  raise ValueError("Invalid option type. Choose either 'call' or 'put'")
+
+
+def payoff_values(payoff: Payoff, paths: PathStatistics) -> NDArray[np.float64]:
+  """
+    The (undiscounted) payoff of each simulated path
+  """
+  style, option_type = payoff["style"], payoff["option_type"]
+  if style != "lookback" and "K" not in payoff:
+    raise ValueError(f"The {style} payoff needs a strike K")
+  if style != "european" and paths["average"] is None:
+    raise ValueError(f"The {style} payoff needs paths simulated with path_dependent=True")
+
+  match style:
+    case "european":
+      return vanilla(option_type, paths["S_T"], payoff["K"])
+
+    case "asian":
+      return vanilla(option_type, paths["average"], payoff["K"])
+
+    case "barrier":
+      direction, _, knock = payoff.get("barrier_type", "").partition("-and-")
+      if "barrier" not in payoff or direction not in ("up", "down") or knock not in ("in", "out"):
+        raise ValueError("The barrier payoff needs a barrier and a barrier_type of up/down-and-in/out")
+      crossed = paths["maximum"] >= payoff["barrier"] if direction == "up" else paths["minimum"] <= payoff["barrier"]
+      active = crossed if knock == "in" else ~crossed
+      return vanilla(option_type, paths["S_T"], payoff["K"]) * active
+
+    case "lookback":
+      extreme = paths["maximum"] if option_type == "call" else paths["minimum"]
+      if "K" in payoff:
+        return vanilla(option_type, extreme, payoff["K"])
+      # Floating strike: a call is struck at the minimum and a put at the maximum, so both are always exercised
+      floating_strike = paths["minimum"] if option_type == "call" else paths["maximum"]
+      return np.abs(paths["S_T"] - floating_strike)
+
+  raise ValueError(f"Invalid payoff style: {style!r}")
+
+
+def price_payoffs(payoffs: List[Payoff], paths: PathStatistics, r: float, tau: float) -> List[PayoffPrice]:
+  """
+    Price many payoffs on one simulated path set. Each price carries the standard error of its estimate;
+    the estimates are correlated, as every payoff is evaluated on the same paths.
+  """
+  discount = np.exp(-r * tau)
+  prices: List[PayoffPrice] = []
+  for payoff in payoffs:
+    values = discount * payoff_values(payoff, paths)
+    prices.append({"price": np.mean(values), "standard_error": np.std(values, ddof=1) / np.sqrt(len(values))})
+  return prices
 
 
 def monte_carlo(option_type: OptionType, S_0: float, K: float,  tau: float, r: float, sigma: float, num_trials: int = 100, seed: int = 1234, num_timesteps: int = 100) -> float:
@@ -23,28 +147,14 @@ def monte_carlo(option_type: OptionType, S_0: float, K: float,  tau: float, r: f
         2) Calculate the payoff of the option based on the stock price.
         3) We discount the payoff at the risk-free rate to today’s price
   """
-  # The time unit is years
-  dt = tau / num_timesteps
-  nudt = (r - 0.5 * sigma ** 2) * (dt)
-  volsdt = sigma * np.sqrt(dt)
-  lnS_0 = np.log(S_0)
-
-  np.random.seed(seed)
   if option_type not in ['call', 'put']:
     raise ValueError("Invalid option type. Choose either 'call' or 'put'")
 
-  # 1) Simulate asset paths for the geometric Brownian motion.
-  Z = np.random.normal(size=(num_timesteps, num_trials))
-  delta_lnS_t = nudt + volsdt*Z
-  lnS_t = lnS_0 + np.cumsum(delta_lnS_t, axis=0)  # axis=0 performs the summation over time steps
-  S_T = np.exp(lnS_t[-1])
+  # 1) Simulate asset paths for the geometric Brownian motion, keeping only the price at maturity.
+  paths = simulate_path_statistics(S_0, tau, r, sigma, num_trials, seed, num_timesteps, path_dependent=False)
 
   # 2) Calculate the payoff for each path for a call or put.
-  if option_type == 'call':
-    payoff = np.maximum(S_T - K, 0)
-  elif option_type == 'put':
-    payoff = np.maximum(K - S_T, 0)
-  mean_payoff = np.mean(payoff)
+  mean_payoff = np.mean(vanilla(option_type, paths["S_T"], K))
 
   # 3) Discount the average payoff back to time zero.
   discounted_payoff = np.exp(-r * tau) * mean_payoff
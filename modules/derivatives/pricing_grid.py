@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Hashable, Literal
+
+import numpy as np
+from numpy.typing import NDArray
+
+from modules.derivatives.binomial_model import strike_vector_price
+
+
+type OptionType = Literal['call', 'put']
+
+# Default grid: moneyness K / S_0 and time to expiry (in years). The expiry axis is uniform in sqrt(tau),
+# which concentrates nodes at short expiries where prices change fastest. Both axes have an odd number of
+# nodes, which the error estimate relies on.
+MONEYNESS = np.linspace(0.5, 1.5, 41)
+SQRT_TAU = np.linspace(np.sqrt(1 / 365), np.sqrt(3.0), 25)
+
+# Quotes whose estimated interpolation error exceeds this (as a fraction of S_0), or this fraction of the
+# price itself, fall through to the exact engine. The relative bound keeps cheap out-of-the-money quotes,
+# whose absolute error is small but may be several times their price, from being interpolated.
+DEFAULT_TOLERANCE = 5e-4
+DEFAULT_RELATIVE_TOLERANCE = 1e-2
+
+
+class PricingGrid(object):
+  """
+    Option prices on a (time to expiry x moneyness) grid, for fixed sigma and r.
+    Prices are homogeneous of degree one in (S_0, K), so the grid is built for S_0 = 1 and a quote is
+    S_0 * v(sqrt(tau), K / S_0), where v is interpolated bilinearly.
+
+    Every grid cell carries an error bound, estimated by predicting each odd-indexed node by interpolation
+    from its even-indexed neighbours. That is the error of a grid with twice the spacing; linear interpolation
+    error scales with the square of the spacing, so the full grid's error is about a quarter of it. Half of
+    it is used as the bound, leaving a safety margin.
+  """
+
+  def __init__(self, sqrt_tau: NDArray[np.float64], moneyness: NDArray[np.float64], values: NDArray[np.float64]):
+    self.sqrt_tau = sqrt_tau
+    self.moneyness = moneyness
+    self.values = values
+    self.errors = self.cell_errors(values)
+
+  @classmethod
+  def build(cls, price_strikes: Callable[[NDArray[np.float64], float], NDArray[np.float64]], sqrt_tau: NDArray[np.float64] = SQRT_TAU, moneyness: NDArray[np.float64] = MONEYNESS) -> "PricingGrid":
+    """
+      - price_strikes: prices options with S_0 = 1 on a vector of strikes, for a time to expiry tau
+    """
+    values = np.array([price_strikes(moneyness, float(s) ** 2) for s in sqrt_tau])
+    return cls(sqrt_tau, moneyness, values)
+
+  @staticmethod
+  def cell_errors(values: NDArray[np.float64]) -> NDArray[np.float64]:
+    # Error of the odd nodes, predicted by linear interpolation from their neighbours along each axis
+    tau_errors = np.abs(values[1:-1:2, :] - 0.5 * (values[:-2:2, :] + values[2::2, :]))
+    moneyness_errors = np.abs(values[:, 1:-1:2] - 0.5 * (values[:, :-2:2] + values[:, 2::2]))
+
+    # Each cell (i, i + 1) x (j, j + 1) spans exactly one odd node along each axis, whose error estimate has
+    # index i // 2 (resp. j // 2). A cell takes the larger estimate of its two edges along each axis.
+    half_rows = np.arange(values.shape[0] - 1) // 2
+    half_cols = np.arange(values.shape[1] - 1) // 2
+    tau_cell = np.maximum(tau_errors[half_rows, :-1], tau_errors[half_rows, 1:])
+    moneyness_cell = np.maximum(moneyness_errors[:-1, half_cols], moneyness_errors[1:, half_cols])
+    return 0.5 * (tau_cell + moneyness_cell)
+
+  def quote(self, S_0: float, K: float, tau: float, tolerance: float = DEFAULT_TOLERANCE, relative_tolerance: float = DEFAULT_RELATIVE_TOLERANCE) -> float | None:
+    """
+      The interpolated price, or None if the point lies outside the grid or its cell's error bound exceeds
+      `tolerance` (as a fraction of S_0) or `relative_tolerance` (as a fraction of the price)
+    """
+    x, y = np.sqrt(tau), K / S_0
+    if not (self.sqrt_tau[0] <= x <= self.sqrt_tau[-1] and self.moneyness[0] <= y <= self.moneyness[-1]):
+      return None
+    i = min(int(np.searchsorted(self.sqrt_tau, x, side="right")) - 1, len(self.sqrt_tau) - 2)
+    j = min(int(np.searchsorted(self.moneyness, y, side="right")) - 1, len(self.moneyness) - 2)
+    if self.errors[i, j] > tolerance:
+      return None
+
+    # Bilinear interpolation within the cell
+    a = (x - self.sqrt_tau[i]) / (self.sqrt_tau[i + 1] - self.sqrt_tau[i])
+    b = (y - self.moneyness[j]) / (self.moneyness[j + 1] - self.moneyness[j])
+    v = self.values
+    value = (1 - a) * ((1 - b) * v[i, j] + b * v[i, j + 1]) + a * ((1 - b) * v[i + 1, j] + b * v[i + 1, j + 1])
+    if self.errors[i, j] > relative_tolerance * value:
+      return None
+    return S_0 * value
+
+
+def binomial_grid(instrument: OptionType, sigma: float, r: float, num_steps: int, american: bool) -> PricingGrid:
+  return PricingGrid.build(lambda K, tau: strike_vector_price(instrument, 1.0, sigma, r, K, tau, num_steps, american))
+
+
+class GridCache(object):
+  """
+    A bounded LRU cache of pricing grids. Grids are built in a background thread, and quotes return None
+    (falling through to the exact engine) until the grid is ready.
+
+    A build takes seconds, and keys include client inputs such as R_f, so builds are rationed: a grid is
+    only built once its key has been quoted `min_requests` times, and at most `max_pending` builds are
+    queued at once. A key whose build is refused is built on a later quote, once there is room.
+  """
+
+  def __init__(self, maxsize: int = 64, min_requests: int = 2, max_pending: int = 2):
+    self.maxsize = maxsize
+    self.min_requests = min_requests
+    self.max_pending = max_pending
+    self._grids: OrderedDict[Hashable, PricingGrid] = OrderedDict()
+    self._pending: set[Hashable] = set()
+    # Quote counts of keys without a grid, bounded like the grids
+    self._requests: OrderedDict[Hashable, int] = OrderedDict()
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(max_workers=1)
+
+  def quote(self, key: Hashable, build: Callable[[], PricingGrid], S_0: float, K: float, tau: float) -> float | None:
+    with self._lock:
+      grid = self._grids.get(key)
+      if grid is not None:
+        self._grids.move_to_end(key)
+      elif key not in self._pending:
+        requests = self._requests.pop(key, 0) + 1
+        if requests >= self.min_requests and len(self._pending) < self.max_pending:
+          self._pending.add(key)
+          self._executor.submit(self._build, key, build)
+        else:
+          self._requests[key] = requests
+          while len(self._requests) > 4 * self.maxsize:
+            self._requests.popitem(last=False)
+    return None if grid is None else grid.quote(S_0, K, tau)
+
+  def _build(self, key: Hashable, build: Callable[[], PricingGrid]) -> None:
+    try:
+      grid = build()
+      with self._lock:
+        self._grids[key] = grid
+        while len(self._grids) > self.maxsize:
+          self._grids.popitem(last=False)
+    finally:
+      with self._lock:
+        self._pending.discard(key)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._grids.clear()
+      self._requests.clear()
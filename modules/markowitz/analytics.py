@@ -0,0 +1,86 @@
+import math
+from typing import List, Optional, TypedDict
+import numpy as np
+import numpy.typing as npt
+
+
+class PortfolioAnalytics(TypedDict):
+  return_: List[Optional[float]]
+  risk: List[Optional[float]]
+  sharpe_ratio: List[Optional[float]]
+  sortino_ratio: List[Optional[float]]
+  max_drawdown: List[Optional[float]]
+  value_at_risk: List[Optional[float]]
+  conditional_value_at_risk: List[Optional[float]]
+
+
+# Bound on the number of floats in the (days x portfolios) matrix of portfolio returns evaluated at once
+CHUNK_SIZE = 2 ** 22
+
+
+def portfolio_analytics(
+    rets: npt.NDArray[np.float64],
+    weights: npt.NDArray[np.float64],
+    R_f: float,
+    confidence: float = 0.95
+) -> PortfolioAnalytics:
+  """Calculate risk and return statistics for many portfolios at once.
+
+    The daily returns of every portfolio are obtained with a single matrix product, rets @ weights.T, and all
+    statistics are then computed column-wise. Large batches are split into chunks of portfolios to bound memory.
+
+    Parameters
+    ----------
+    rets: 2D numpy array of daily returns for each asset (days x assets).
+    weights: 2D numpy array of portfolio weights (portfolios x assets).
+    R_f: Risk-free rate (annualized), used as the target return for the Sharpe and Sortino ratios.
+    confidence: Confidence level of the historical VaR and CVaR.
+
+    Returns
+    -------
+    PortfolioAnalytics
+        A dictionary of lists, with one entry per portfolio. Statistics which are undefined for a portfolio
+        (e.g. the Sharpe ratio of a portfolio with zero volatility) are None.
+        - return_, risk: Annualized mean return and volatility.
+        - sharpe_ratio, sortino_ratio: Excess return over volatility, and over downside deviation below R_f.
+        - max_drawdown: Largest peak-to-trough fall in cumulative value, as a fraction of the peak.
+        - value_at_risk, conditional_value_at_risk: Historical one-day loss at the confidence level, and the
+          mean loss on days at least that bad (both as positive fractions).
+  """
+  T = rets.shape[0]
+  if T == 0:
+    raise ValueError("rets has no rows")
+  chunk = max(1, CHUNK_SIZE // T)
+  results = [_analytics(rets @ weights[i:i + chunk].T, R_f, confidence) for i in range(0, len(weights), chunk)]
+  return {
+      key: [value if math.isfinite(value) else None for result in results for value in result[key].tolist()]
+      for key in PortfolioAnalytics.__annotations__
+  }
+
+
+@np.errstate(divide="ignore", invalid="ignore")
+def _analytics(daily_returns: npt.NDArray[np.float64], R_f: float, confidence: float):
+  # Notation follows main(): daily_returns are daily, everything returned is annualized. Degenerate portfolios
+  # give infinite or NaN ratios, which are reported as None.
+  R_p = 252 * np.mean(daily_returns, axis=0)
+  risk = np.sqrt(252 * np.var(daily_returns, axis=0, ddof=1))
+  # Downside deviation, as in calculate_sortino_variance
+  downside_variance = 252 * np.mean(np.square(np.minimum(0, daily_returns - R_f / 252)), axis=0)
+
+  wealth = np.cumprod(1 + daily_returns, axis=0)
+  peaks = np.maximum(np.maximum.accumulate(wealth, axis=0), 1)
+  max_drawdown = np.max(1 - wealth / peaks, axis=0)
+
+  var_threshold = np.quantile(daily_returns, 1 - confidence, axis=0)
+  tail = daily_returns <= var_threshold
+  cvar = -np.sum(daily_returns * tail, axis=0) / np.sum(tail, axis=0)
+
+  return {
+      "return_": R_p,
+      "risk": risk,
+      "sharpe_ratio": (R_p - R_f) / risk,
+      "sortino_ratio": (R_p - R_f) / np.sqrt(downside_variance),
+      "max_drawdown": max_drawdown,
+      "value_at_risk": -var_threshold,
+      "conditional_value_at_risk": cvar,
+  }
@@ -1,9 +1,10 @@
 from cvxopt import matrix, solvers
 import os
-from typing import Dict, TypedDict, Tuple, List, Any
+from typing import Callable, ContextManager, Dict, TypedDict, Tuple, List, Any
 import numpy as np
 import numpy.typing as npt
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from functools import partial
 
 # Switch to True to display the convex optimization progress in the server logs
@@ -46,7 +47,8 @@ class MainReturnType(TypedDict):
 def main(
     tickers: List[str],
     rets: npt.NDArray[np.float64],
-    allowShortSelling: bool, R_f: float
+    allowShortSelling: bool, R_f: float,
+    stage: Callable[[str], ContextManager[Any]] = nullcontext
 ) -> MainReturnType:
   """Calculate the efficient frontier, tangency portfolio, and Sortino variance for an input set of asset returns.
 
@@ -59,6 +61,7 @@ def main(
     rets: 2D numpy array of daily returns for each asset.
     allowShortSelling: Boolean indicating if short selling is allowed.
     R_f: Risk-free rate.
+    stage: Optional hook timing each stage of the calculation (covariance, solver), called with its name.
 
     Returns
     -------
@@ -72,23 +75,25 @@ def main(
     """
 
   # Notation: rets are daily, mu and Sigma are annualized
-  mu: npt.NDArray = 252 * np.nanmean(rets, axis=0)
-  Sigma: npt.NDArray = 252 * np.cov(rets, rowvar=False)
-  inv_Sigma: npt.NDArray = np.linalg.inv(Sigma)
-
-  # Calculate the efficient frontier
-  if allowShortSelling:
-    max = 1
-    min = -0.2
-    R_p_linspace = np.linspace(min, max, num=60)
-    weights, sigma_p = efficient_frontier(mu, inv_Sigma, R_p_linspace)
-  else:
-    max = np.max(mu)
-    min = np.min(mu)
-    R_p_linspace = np.linspace(min, max, num=60)
-    weights, sigma_p = efficient_frontier_numerical(mu, Sigma, R_p_linspace)
-
-  tangency_portfolio = find_tangency_portfolio(mu, Sigma, inv_Sigma, R_f, allow_short_selling=allowShortSelling)
+  with stage("covariance"):
+    mu: npt.NDArray = 252 * np.nanmean(rets, axis=0)
+    Sigma: npt.NDArray = 252 * np.cov(rets, rowvar=False)
+    inv_Sigma: npt.NDArray = np.linalg.inv(Sigma)
+
+  with stage("solver"):
+    # Calculate the efficient frontier
+    if allowShortSelling:
+      max = 1
+      min = -0.2
+      R_p_linspace = np.linspace(min, max, num=60)
+      weights, sigma_p = efficient_frontier(mu, inv_Sigma, R_p_linspace)
+    else:
+      max = np.max(mu)
+      min = np.min(mu)
+      R_p_linspace = np.linspace(min, max, num=60)
+      weights, sigma_p = efficient_frontier_numerical(mu, Sigma, R_p_linspace)
+
+    tangency_portfolio = find_tangency_portfolio(mu, Sigma, inv_Sigma, R_f, allow_short_selling=allowShortSelling)
   sortino_variance = calculate_sortino_variance(rets, tangency_portfolio['weights'], R_f)
 
   return {
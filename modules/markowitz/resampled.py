@@ -0,0 +1,216 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, TypedDict
+from cvxopt import matrix
+import numpy as np
+import numpy.typing as npt
+
+from modules.markowitz.main import efficient_frontier, calculate_portfolio
+
+
+class ResampledFrontierPoint(TypedDict):
+  return_: float
+  risk: float
+  weights: List[float]
+  weights_lower: List[float]
+  weights_upper: List[float]
+
+
+class ResampledReturnType(TypedDict):
+  tickers: List[str]
+  num_samples: int
+  efficient_frontier: List[ResampledFrontierPoint]
+
+
+# Bound on the number of floats in a batch of bootstrap row counts and covariances (8 MiB)
+CHUNK_SIZE = 2 ** 20
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def bootstrap_moments(
+    rets: npt.NDArray[np.float64],
+    num_samples: int,
+    seed: Optional[int] = None
+) -> Iterator[Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]]:
+  """
+    Yield the annualized means (b x N) and covariances (b x N x N) of bootstrap samples of the rows of rets,
+    in batches of b samples.
+
+    Each sample is represented by how many times it draws each row, c, so its second moments are the weighted
+    Gram matrix (rets.T * c) @ rets / T. The covariances are written in place, and the largest temporary is one
+    (T x N) array, the size of rets itself.
+  """
+  rng = np.random.default_rng(seed)
+  T, N = rets.shape
+  batch_size = max(1, CHUNK_SIZE // (T + N * N))
+  for batch_start in range(0, num_samples, batch_size):
+    b = min(batch_size, num_samples - batch_start)
+    counts = np.stack([np.bincount(rng.integers(0, T, T), minlength=T) for _ in range(b)]).astype(float)
+    means = counts @ rets / T
+    covs = np.empty((b, N, N))
+    for k, (c, m) in enumerate(zip(counts, means)):
+      np.matmul(rets.T * c, rets, out=covs[k])
+      covs[k] /= T
+      covs[k] -= np.outer(m, m)
+    covs *= 252 * T / (T - 1)
+    yield 252 * means, covs
+
+
+def _long_only_frontiers(
+    mus: npt.NDArray[np.float64],
+    Sigmas: npt.NDArray[np.float64],
+    num_points: int
+) -> npt.NDArray[np.float64]:
+  """
+    Frontier weights (b x num_points x N) without short selling, for a batch of samples.
+    Runs in a worker process. The constraint matrices are the same for every sample, so are built once.
+  """
+  N = mus.shape[1]
+  q = matrix(np.zeros((N, 1)))
+  G = -matrix(np.eye(N))
+  h = matrix(0.0, (N, 1))
+  weights = np.empty((len(mus), num_points, N))
+  for i, (mu, Sigma) in enumerate(zip(mus, Sigmas)):
+    S = matrix(Sigma)
+    A = matrix(np.vstack([mu, np.ones(N)]))
+    for j, R_p in enumerate(np.linspace(np.min(mu), np.max(mu), num=num_points)):
+      weights[i, j] = np.array(calculate_portfolio(R_p, S, q, G, h, A)).squeeze(axis=1)
+  return weights
+
+
+type Moments = Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+  """
+    A process pool shared between requests, or None where processes cannot be started (e.g. serverless
+    runtimes without /dev/shm), in which case samples are solved in-process
+  """
+  global _pool
+  if _pool is None:
+    try:
+      _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, NotImplementedError):
+      return None
+  return _pool
+
+
+def reset_pool(pool: ProcessPoolExecutor) -> None:
+  global _pool
+  pool.shutdown(wait=False, cancel_futures=True)
+  if _pool is pool:
+    _pool = None
+
+
+def long_only_weights(chunks: Iterable[Moments], num_points: int) -> Iterator[npt.NDArray[np.float64]]:
+  """
+    Yield the long-only frontier weights of each chunk of (means, covariances), in order, solving the chunks in
+    parallel across the process pool. At most two chunks per worker are queued, so chunks are drawn from
+    `chunks` as workers free up rather than all held in memory at once. If the pool breaks, the chunks it has
+    not returned (and the remaining ones) are solved in-process, and the next request starts a fresh pool.
+  """
+  pool = get_pool()
+  max_queued = 2 * (os.cpu_count() or 1)
+  queued: Deque[Tuple[Moments, Optional[Future]]] = deque()
+
+  def collect(chunk: Moments, future: Optional[Future]) -> npt.NDArray[np.float64]:
+    nonlocal pool
+    if future is not None:
+      try:
+        return future.result()
+      except BrokenProcessPool:
+        if pool is not None:
+          reset_pool(pool)
+          pool = None
+    return _long_only_frontiers(*chunk, num_points)
+
+  for chunk in chunks:
+    future = None
+    if pool is not None:
+      try:
+        future = pool.submit(_long_only_frontiers, *chunk, num_points)
+      except BrokenProcessPool:
+        reset_pool(pool)
+        pool = None
+    queued.append((chunk, future))
+    while len(queued) > (max_queued if pool is not None else 0):
+      yield collect(*queued.popleft())
+  while queued:
+    yield collect(*queued.popleft())
+
+
+def resampled_frontier(
+    tickers: List[str],
+    rets: npt.NDArray[np.float64],
+    allowShortSelling: bool,
+    num_samples: int = 100,
+    num_points: int = 60,
+    seed: Optional[int] = None,
+) -> ResampledReturnType:
+  """Calculate the resampled (Michaud) efficient frontier.
+
+    The frontier is recomputed for bootstrap samples of the returns, and the weights at each rank along the
+    frontier are averaged over the samples. This spreads the weights over assets whose estimated returns are
+    statistically indistinguishable, making the frontier much less sensitive to estimation error.
+
+    Parameters
+    ----------
+    tickers: List of asset tickers.
+    rets: 2D numpy array of daily returns for each asset.
+    allowShortSelling: Boolean indicating if short selling is allowed.
+    num_samples: The number of bootstrap samples.
+    num_points: The number of points along the frontier.
+
+    Returns
+    -------
+    ResampledReturnType
+        A dictionary containing the averaged frontier. Each point has the return and risk of its averaged
+        weights (evaluated with the full-sample mu and Sigma), and the 5th and 95th percentiles of the weights
+        across samples.
+  """
+  mu: npt.NDArray = 252 * np.mean(rets, axis=0)
+  Sigma: npt.NDArray = 252 * np.cov(rets, rowvar=False)
+
+  # The batches are consumed as they are generated, so only a batch or two of covariances is held at a time;
+  # what accumulates is the frontier weights of every sample
+  batches = bootstrap_moments(rets, num_samples, seed)
+  weights = np.empty((num_samples, num_points, len(mu)))
+  if allowShortSelling:
+    # Analytic frontier over the same range of returns as main(), so every sample is ranked identically
+    R_p_linspace = np.linspace(-0.2, 1, num=num_points)
+    frontiers = (
+        efficient_frontier(mu_b, inv_Sigma_b, R_p_linspace)[0][None]
+        for mus, Sigmas in batches
+        for mu_b, inv_Sigma_b in zip(mus, np.linalg.inv(Sigmas))
+    )
+  else:
+    # Each sample needs num_points QPs, so the samples are split into chunks solved in parallel across processes
+    workers = os.cpu_count() or 1
+    chunks = (
+        (mus[idx], Sigmas[idx])
+        for mus, Sigmas in batches
+        for idx in np.array_split(np.arange(len(mus)), workers) if len(idx)
+    )
+    frontiers = long_only_weights(chunks, num_points)
+  start = 0
+  for frontier in frontiers:
+    weights[start:start + len(frontier)] = frontier
+    start += len(frontier)
+
+  average_weights = weights.mean(axis=0)
+  lower, upper = np.percentile(weights, [5, 95], axis=0)
+  returns = average_weights @ mu
+  risks = np.sqrt(np.sum(average_weights * (average_weights @ Sigma), axis=1))
+
+  return {
+      "tickers": tickers,
+      "num_samples": num_samples,
+      "efficient_frontier": [
+          {"return_": returns[i], "risk": risks[i], "weights": average_weights[i].tolist(), "weights_lower": lower[i].tolist(), "weights_upper": upper[i].tolist()}
+          for i in range(num_points)
+      ],
+  }
@@ -0,0 +1,127 @@
+from cvxopt import matrix, solvers
+from typing import Iterator, List, Optional, Tuple, TypedDict
+import numpy as np
+import numpy.typing as npt
+
+from modules.markowitz.main import find_tangency_portfolio, calculate_sortino_variance, TangencyPortfolio
+
+
+class FrontierSummary(TypedDict):
+  return_: float
+  risk: float
+
+
+class RollingWindowResult(TypedDict):
+  start: int
+  end: int
+  # None where no portfolio has a return above R_f (long-only), so the tangency portfolio does not exist
+  tangency_portfolio: Optional[TangencyPortfolio]
+  sharpe_ratio: Optional[float]
+  sortino_ratio: Optional[float]
+  min_variance_portfolio: FrontierSummary
+
+
+def rolling_moments(
+    rets: npt.NDArray[np.float64],
+    windows: List[Tuple[int, int]]
+) -> Iterator[Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]]:
+  """
+    Yield the annualized mean and covariance of the returns in each window of rows [start, end).
+
+    Rather than calling np.cov for every window, running sums of the rows and of their outer products are
+    updated as rows enter and leave the window, so each step costs O(k N^2) for k rows moved. The returns are
+    shifted by the first window's mean before accumulating, which avoids cancellation in the covariance.
+    The windows must move forward, i.e. both start and end are non-decreasing.
+  """
+  N = rets.shape[1]
+  shift = np.mean(rets[windows[0][0]:windows[0][1]], axis=0) if windows else np.zeros(N)
+  X = rets - shift
+
+  s1 = np.zeros(N)
+  s2 = np.zeros((N, N))
+  start, end = 0, 0
+  for window_start, window_end in windows:
+    if window_start < start or window_end < end:
+      raise ValueError("Rolling windows must move forward")
+    if window_end - window_start < 2:
+      raise ValueError("Each rolling window must contain at least two rows")
+
+    # Rows entering the window (skipping any which also leave it immediately)
+    entering = X[max(end, window_start):window_end]
+    s1 += entering.sum(axis=0)
+    s2 += entering.T @ entering
+    # Rows leaving the window
+    leaving = X[start:min(window_start, end)]
+    s1 -= leaving.sum(axis=0)
+    s2 -= leaving.T @ leaving
+    start, end = window_start, window_end
+
+    n = end - start
+    mean = s1 / n
+    cov = (s2 - n * np.outer(mean, mean)) / (n - 1)
+    yield 252 * (mean + shift), 252 * cov
+
+
+def rolling_frontier(
+    rets: npt.NDArray[np.float64],
+    windows: List[Tuple[int, int]],
+    allowShortSelling: bool, R_f: float
+) -> List[RollingWindowResult]:
+  """Calculate the tangency portfolio, its Sharpe and Sortino ratios, and the minimum variance portfolio for each rolling window.
+
+    Parameters
+    ----------
+    rets: 2D numpy array of daily returns for each asset.
+    windows: Row ranges [start, end) of the windows, moving forward through rets.
+    allowShortSelling: Boolean indicating if short selling is allowed.
+    R_f: Risk-free rate.
+  """
+  results: List[RollingWindowResult] = []
+  N = rets.shape[1]
+  ones = np.ones(N)
+  for (start, end), (mu, Sigma) in zip(windows, rolling_moments(rets, windows)):
+    if allowShortSelling:
+      # Analytic solutions, sharing one factorization of Sigma between both portfolios
+      inv_Sigma_at = np.linalg.solve(Sigma, np.column_stack([mu - R_f, ones]))
+      tangency_weights = inv_Sigma_at[:, 0] / np.sum(inv_Sigma_at[:, 0])
+      min_variance_weights = inv_Sigma_at[:, 1] / np.sum(inv_Sigma_at[:, 1])
+      tangency_portfolio: TangencyPortfolio = {
+          "return_": mu @ tangency_weights,
+          "risk": np.sqrt(tangency_weights @ Sigma @ tangency_weights),
+          "weights": tangency_weights.tolist(),
+      }
+    else:
+      try:
+        tangency_portfolio = find_tangency_portfolio(mu, Sigma, None, R_f, allow_short_selling=False)
+      except (ValueError, ArithmeticError):
+        # The QP is infeasible when every asset's mean return is below R_f, as in a bear market window
+        tangency_portfolio = None
+      min_variance_weights = min_variance_long_only(Sigma)
+
+    sharpe_ratio = sortino_ratio = None
+    if tangency_portfolio is not None:
+      downside_variance = calculate_sortino_variance(rets[start:end], tangency_portfolio["weights"], R_f)
+      excess_return = tangency_portfolio["return_"] - R_f
+      sharpe_ratio = excess_return / tangency_portfolio["risk"]
+      sortino_ratio = excess_return / np.sqrt(downside_variance)
+    results.append({
+        "start": start,
+        "end": end,
+        "tangency_portfolio": tangency_portfolio,
+        "sharpe_ratio": sharpe_ratio,
+        "sortino_ratio": sortino_ratio,
+        "min_variance_portfolio": {
+            "return_": mu @ min_variance_weights,
+            "risk": np.sqrt(min_variance_weights @ Sigma @ min_variance_weights),
+        },
+    })
+  return results
+
+
+def min_variance_long_only(Sigma: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+  """
+    The global minimum variance portfolio when short selling is not allowed, by quadratic programming
+  """
+  N = len(Sigma)
+  x = solvers.qp(matrix(Sigma), matrix(np.zeros((N, 1))), -matrix(np.eye(N)), matrix(0.0, (N, 1)), matrix(np.ones((1, N))), matrix(1.0))['x']
+  return np.array(x).squeeze(axis=1)
@@ -0,0 +1,35 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache(object):
+  """
+    A bounded, thread-safe, least recently used cache
+  """
+
+  def __init__(self, maxsize: int = 32):
+    self.maxsize = maxsize
+    self._items: OrderedDict[Hashable, Any] = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key: Hashable) -> Optional[Any]:
+    with self._lock:
+      if key not in self._items:
+        return None
+      self._items.move_to_end(key)
+      return self._items[key]
+
+  def set(self, key: Hashable, value: Any) -> None:
+    with self._lock:
+      self._items[key] = value
+      self._items.move_to_end(key)
+      while len(self._items) > self.maxsize:
+        self._items.popitem(last=False)
+
+  def clear(self) -> None:
+    with self._lock:
+      self._items.clear()
+
+  def __len__(self) -> int:
+    return len(self._items)
@@ -0,0 +1,64 @@
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class DataVersion(object):
+  """
+    The version stamp of the database contents, which changes whenever the data is (re)loaded.
+
+    The stamp is stored in the database, so that every server instance sees a reseed, and cached in-process
+    for `ttl` seconds: within that time, conditional requests are answered without touching the database.
+    `load` returns the stored stamp, or None if the database has none (its responses are then not cached).
+  """
+
+  def __init__(self, load: Callable[[], Awaitable[Optional[str]]], ttl: float = 60.0):
+    self.load = load
+    self.ttl = ttl
+    self._version: Optional[str] = None
+    self._expires = 0.0
+
+  async def get(self) -> Optional[str]:
+    if time.monotonic() >= self._expires:
+      self.set(await self.load())
+    return self._version
+
+  def set(self, version: Optional[str]) -> None:
+    self._version = version
+    self._expires = time.monotonic() + self.ttl
+
+
+def new_version() -> str:
+  return f"{time.time_ns():x}"
+
+
+def etag(version: str, path: str, query: str) -> str:
+  """
+    A strong ETag for a response, derived from the data version and the request rather than the response
+    body, so it can be checked before any work is done. Only valid for responses which are a deterministic
+    function of the data and the request.
+  """
+  digest = hashlib.sha256(f"{version}\n{path}?{query}".encode()).hexdigest()
+  return f'"{digest[:32]}"'
+
+
+def matches(if_none_match: Optional[str], tag: str) -> bool:
+  """
+    Whether an If-None-Match header matches the ETag. Entity tags are compared weakly, as specified for
+    If-None-Match, since intermediaries (e.g. compressing CDNs) may weaken them.
+  """
+  if if_none_match is None:
+    return False
+  if if_none_match.strip() == "*":
+    return True
+  return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def cache_headers(tag: Optional[str], ttl: float) -> Dict[str, str]:
+  """
+    Browsers revalidate on every use (answered with a 304 while the data is unchanged), while shared caches
+    such as the Vercel CDN may serve a response for as long as an instance may keep serving its data version.
+  """
+  if tag is None:
+    return {}
+  return {"ETag": tag, "Cache-Control": f"public, max-age=0, must-revalidate, s-maxage={int(ttl)}"}
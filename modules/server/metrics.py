@@ -0,0 +1,107 @@
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple, Any
+
+
+# Prometheus' default latency buckets, extended for the slower solver and simulation paths
+DEFAULT_BUCKETS: Tuple[float, ...] = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def assets_bucket(num_assets: int) -> str:
+  """
+    Bucket an asset count into a label value, keeping the label cardinality bounded
+  """
+  for upper in (10, 50, 100, 250, 500):
+    if num_assets <= upper:
+      return f"<={upper}"
+  return ">500"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+  if not labels:
+    return ""
+  def escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+  return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+  if value == math.inf:
+    return "+Inf"
+  return repr(float(value))
+
+
+class Histogram(object):
+  """
+    A minimal Prometheus histogram, so that the serverless bundle does not need prometheus_client
+  """
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = tuple(labelnames)
+    self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    self._lock = threading.Lock()
+    self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+    REGISTRY.append(self)
+
+  def observe(self, value: float, **labels: Any) -> None:
+    key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+    with self._lock:
+      counts, total = self._series.setdefault(key, ([0] * len(self.buckets), [0.0]))
+      for i, upper in enumerate(self.buckets):
+        if value <= upper:
+          counts[i] += 1
+      total[0] += value
+
+  def render(self) -> List[str]:
+    lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+    with self._lock:
+      for key, (counts, total) in sorted(self._series.items()):
+        labels = dict(zip(self.labelnames, key))
+        for upper, count in zip(self.buckets, counts):
+          lines.append(f"{self.name}_bucket{_format_labels(labels | {'le': _format_value(upper)})} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total[0])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {counts[-1]}")
+    return lines
+
+
+REGISTRY: List[Histogram] = []
+
+LABELS = ("route", "method", "option_type", "assets")
+
+request_duration = Histogram(
+    "request_duration_seconds", "Request latency, by route, pricing method, option type and asset count.", LABELS,
+)
+stage_duration = Histogram(
+    "stage_duration_seconds", "Latency of each request stage (db, dataframe, covariance, solver, pricing, serialise).",
+    LABELS + ("stage",),
+)
+
+
+def pool_gauges(pool: Any) -> List[str]:
+  """
+    Gauges describing the state of a SQLAlchemy QueuePool, read at scrape time
+  """
+  stats = {
+      "db_pool_size": ("Configured size of the connection pool.", pool.size()),
+      "db_pool_checked_in": ("Idle connections in the pool.", pool.checkedin()),
+      "db_pool_checked_out": ("Connections currently in use.", pool.checkedout()),
+      "db_pool_overflow": ("Connections open beyond the pool size.", pool.overflow()),
+  }
+  lines = []
+  for name, (documentation, value) in stats.items():
+    lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {value}"]
+  return lines
+
+
+def render_latest(pool: Any = None) -> str:
+  """
+    All registered metrics in the Prometheus text exposition format
+  """
+  lines = [line for histogram in REGISTRY for line in histogram.render()]
+  if pool is not None:
+    lines += pool_gauges(pool)
+  return "\n".join(lines) + "\n"
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from modules.server.timing import stage
+
+
+class SingleFlight(object):
+  """
+    Coalesce concurrent identical computations: while a computation for a key is in flight, further calls
+    with the same key await its result instead of starting their own.
+
+    The computation runs as its own task, so a caller that is cancelled (e.g. a client disconnecting) does
+    not cancel it for the other callers. Results are not cached: the key is released once the task is done.
+  """
+
+  def __init__(self):
+    self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+  async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+    task = self._inflight.get(key)
+    if task is None:
+      task = asyncio.ensure_future(fn())
+      self._inflight[key] = task
+      task.add_done_callback(lambda done: self._release(key, done))
+      return await asyncio.shield(task)
+
+    # Time spent waiting on another request's computation is reported as its own stage
+    with stage("coalesced"):
+      return await asyncio.shield(task)
+
+  def _release(self, key: Hashable, task: asyncio.Task) -> None:
+    if self._inflight.get(key) is task:
+      del self._inflight[key]
+
+  def __len__(self) -> int:
+    return len(self._inflight)
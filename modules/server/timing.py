@@ -0,0 +1,77 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from modules.server import metrics
+
+
+@dataclass
+class RequestTimings:
+  stages: Dict[str, float] = field(default_factory=dict)
+  labels: Dict[str, str] = field(default_factory=dict)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+  """
+    Time a stage of the current request. Outside of a request (e.g. in benchmarks) this is a no-op.
+    Repeated stages with the same name are accumulated.
+  """
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    if (timings := _current.get()) is not None:
+      timings.stages[name] = timings.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def set_labels(**labels: Any) -> None:
+  """
+    Attach metric labels (method, option_type, assets) to the current request
+  """
+  if (timings := _current.get()) is not None:
+    timings.labels.update({k: str(v) for k, v in labels.items()})
+
+
+def server_timing_header(stages: Dict[str, float], total: float) -> str:
+  return ", ".join(f"{name};dur={1000 * duration:.2f}" for name, duration in (stages | {"total": total}).items())
+
+
+class ServerTimingMiddleware(object):
+  """
+    ASGI middleware which collects the stages timed during a request, exposes them in a `Server-Timing`
+    response header and records them in the latency histograms.
+  """
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      return await self.app(scope, receive, send)
+
+    timings = RequestTimings()
+    token = _current.set(timings)
+    start = time.perf_counter()
+
+    async def send_with_timing(message):
+      if message["type"] == "http.response.start":
+        header = server_timing_header(timings.stages, time.perf_counter() - start)
+        message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+      await send(message)
+
+    try:
+      await self.app(scope, receive, send_with_timing)
+    finally:
+      _current.reset(token)
+      # Label by the route template rather than the raw path, so that path parameters do not explode cardinality
+      route = getattr(scope.get("route"), "path", "unmatched")
+      labels = {"route": route} | timings.labels
+      metrics.request_duration.observe(time.perf_counter() - start, **labels)
+      for name, duration in timings.stages.items():
+        metrics.stage_duration.observe(duration, stage=name, **labels)